@@ -0,0 +1,86 @@
+import base64
+import functools
+import io
+import os
+from PIL import Image
+
+# Streamlit serves files in <app dir>/static at app/static/ when
+# server.enableStaticServing is on
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_URL = 'app/static'
+
+# widths the background is pre-rendered at, the browser picks one
+WIDTHS = (640, 1280, 1920)
+
+FORMATS = {'WEBP': ('webp', 'image/webp'), 'JPEG': ('jpg', 'image/jpeg')}
+
+
+@functools.lru_cache(maxsize=32)
+def _encode(path, mtime, width, fmt, quality):
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        buf = io.BytesIO()
+        image.save(buf, format=fmt, quality=quality, optimize=True)
+    return buf.getvalue()
+
+def encode_image(path, width=1280, fmt='WEBP', quality=70):
+    """Resized and recompressed image bytes, cached until the file changes"""
+    return _encode(os.path.abspath(path), os.stat(path).st_mtime_ns, width, fmt, quality)
+
+@functools.lru_cache(maxsize=32)
+def _data_uri(path, mtime, width, fmt, quality):
+    encoded = base64.b64encode(_encode(path, mtime, width, fmt, quality)).decode()
+    return 'data:{};base64,{}'.format(FORMATS[fmt][1], encoded)
+
+def data_uri(path, width=1280, fmt='WEBP', quality=70):
+    """Cached base64 data URI of the recompressed image"""
+    return _data_uri(os.path.abspath(path), os.stat(path).st_mtime_ns, width, fmt, quality)
+
+def static_name(path, width, fmt):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return '{}-{}.{}'.format(stem, width, FORMATS[fmt][0])
+
+def build_static_assets(path, widths=WIDTHS, formats=('WEBP', 'JPEG'), quality=70, out_dir=STATIC_DIR):
+    """Write every width/format variant of an image to the static folder
+
+    Variants newer than the source are left alone, so this is cheap to
+    call on every start.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    source_mtime = os.stat(path).st_mtime
+    written = []
+    for width in widths:
+        for fmt in formats:
+            target = os.path.join(out_dir, static_name(path, width, fmt))
+            if not os.path.exists(target) or os.stat(target).st_mtime < source_mtime:
+                with open(target, 'wb') as f:
+                    f.write(encode_image(path, width, fmt, quality))
+            written.append(target)
+    return written
+
+def background_css(path, width=1280, static=False):
+    """CSS background-image declarations for a page background
+
+    With static serving the browser fetches (and caches) the WebP file,
+    or the JPEG where image-set() is unsupported; otherwise a small WebP
+    is inlined as a cached data URI.
+    """
+    if not static:
+        return 'background-image: url({});'.format(data_uri(path, width))
+    build_static_assets(path, (width,))
+    webp = '{}/{}'.format(STATIC_URL, static_name(path, width, 'WEBP'))
+    jpeg = '{}/{}'.format(STATIC_URL, static_name(path, width, 'JPEG'))
+    return ('background-image: url({1});\n'
+            'background-image: image-set(url({0}) type("image/webp"), url({1}) type("image/jpeg"));'
+            ).format(webp, jpeg)
+
+
+if __name__ == '__main__':
+    import sys
+    # pre-render every variant, e.g. python assets.py leaf.jpg
+    for path in sys.argv[1:]:
+        for target in build_static_assets(path):
+            print('wrote', target)
@@ -0,0 +1,89 @@
+import functools
+import os
+import torch
+from cache import checkpoint_fingerprint
+from model import load_model, default_model_path, MODEL_PATH, QUANTIZED
+
+# which runtime executes ResNet9; every backend is a callable taking a
+# N x 3 x 256 x 256 float batch and returning N x 38 logits
+BACKEND = os.environ.get('PLANT_BACKEND', 'eager')
+BACKENDS = ('eager', 'torchscript', 'onnx', 'cascade')
+
+TORCHSCRIPT_PATH = 'plant-disease-model.torchscript.pt'
+ONNX_PATH = 'plant-disease-model.onnx'
+
+
+# ONNX Runtime session wrapped to look like a torch module
+class OnnxModel:
+    def __init__(self, path=ONNX_PATH, threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads or torch.get_num_threads()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, xb):
+        logits, = self.session.run(None, {self.input_name: xb.cpu().numpy()})
+        return torch.from_numpy(logits)
+
+def artifact_path(name=BACKEND, path=None, quantized=QUANTIZED):
+    """The file a backend loads its model from"""
+    if path:
+        return path
+    return {'eager': default_model_path(quantized), 'torchscript': TORCHSCRIPT_PATH, 'onnx': ONNX_PATH, 'cascade': MODEL_PATH}[name]
+
+def backend_fingerprint(name=BACKEND, path=None, quantized=QUANTIZED):
+    """Identifies what a backend predicts, for keying the prediction cache"""
+    fingerprint = checkpoint_fingerprint(artifact_path(name, path, quantized))
+    if name == 'cascade':
+        # the head and threshold change the answers as much as the weights do
+        from cascade import HEAD_PATH, THRESHOLD
+        fingerprint = '{}/cascade:{}@{}'.format(fingerprint, checkpoint_fingerprint(HEAD_PATH), THRESHOLD)
+    return fingerprint
+
+def load_torchscript(path=TORCHSCRIPT_PATH):
+    """Load a frozen export and specialise it for this machine's CPU"""
+    return torch.jit.optimize_for_inference(torch.jit.load(path, map_location='cpu').eval())
+
+def load_backend(name=BACKEND, path=None, quantized=QUANTIZED):
+    """Return the warm model for the named backend, loading it once per process
+
+    path defaults to the backend's standard artifact; quantized only
+    applies to the eager backend.
+    """
+    if name == 'eager':
+        # load_model keeps its own warm cache and start-up timings
+        return load_model(artifact_path(name, path, quantized), quantized)
+    return _load_cached(name, path)
+
+@functools.lru_cache(maxsize=None)
+def _load_cached(name, path):
+    if name == 'torchscript':
+        return load_torchscript(artifact_path(name, path))
+    if name == 'onnx':
+        return OnnxModel(artifact_path(name, path))
+    if name == 'cascade':
+        # slim student from PLANT_CASCADE_HEAD_PATH, threshold from PLANT_CASCADE_THRESHOLD
+        from cascade import build_cascade
+        return build_cascade(artifact_path(name, path))
+    raise ValueError('unknown backend {!r}, expected one of {}'.format(name, BACKENDS))
+
+@torch.inference_mode()
+def check_equivalence(reference, candidates, xb, atol=1e-3):
+    """Compare each candidate's logits and top-1 against the reference model
+
+    candidates maps a backend name to its model; returns per-backend
+    max absolute logit difference, top-1 agreement and a pass flag.
+    """
+    expected = reference(xb).cpu()
+    expected_top1 = expected.argmax(dim=1)
+    report = {}
+    for name, model in candidates.items():
+        logits = model(xb).cpu()
+        max_diff = (logits - expected).abs().max().item()
+        agreement = (logits.argmax(dim=1) == expected_top1).float().mean().item()
+        report[name] = {'max_abs_diff': max_diff,
+                        'top1_agreement': agreement,
+                        'ok': max_diff <= atol and agreement == 1.0}
+    return report
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import os
+import torch
+from torch.utils.data import Dataset, DataLoader
+from model import classes, device, to_device, MODEL_PATH, QUANTIZED
+from backends import load_backend, BACKEND, BACKENDS
+from preprocess import preprocess, INPUT_SIZE
+from pool import InferencePool
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# for listing every image below a directory (e.g. the Kaggle train/valid layout)
+def scan_images(root):
+    """Return image paths under root in a stable order"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(dirpath, name))
+    return paths
+
+# for dropping the half-written record a killed run may leave behind
+def truncate_partial_line(output):
+    """Cut the file back to just after its last newline"""
+    if not os.path.exists(output):
+        return
+    with open(output, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            f.seek(max(0, end - 65536))
+            chunk = f.read(end - max(0, end - 65536))
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                end = end - len(chunk) + newline + 1
+                break
+            end -= len(chunk)
+        if end != size:
+            f.truncate(end)
+
+# for reading the paths an interrupted run already wrote
+def completed_paths(output):
+    """Collect the paths already present in a JSONL or CSV output file"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, newline='') as f:
+        if output.endswith('.csv'):
+            for row in csv.DictReader(f):
+                if row.get('path'):
+                    done.add(row['path'])
+        else:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError, TypeError):
+                    # a damaged line only loses its own record
+                    continue
+    return done
+
+
+class ImageFileDataset(Dataset):
+    """Decodes and transforms images inside DataLoader workers"""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        path = self.paths[idx]
+        try:
+            return preprocess(path), path, True
+        except (OSError, ValueError):
+            return torch.zeros(3, *INPUT_SIZE), path, False
+
+
+class ResultWriter:
+    """Appends one record per image and flushes after every batch"""
+
+    def __init__(self, output):
+        self.csv = output.endswith('.csv')
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        self.file = open(output, 'a', newline='')
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=['path', 'label', 'confidence'])
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+@torch.inference_mode()
+def predict_batch(xb, model):
+    """Return (class index, softmax confidence) for every image in the batch"""
+    probs = torch.softmax(model(to_device(xb, device)), dim=1)
+    confidence, preds = torch.max(probs, dim=1)
+    return preds.tolist(), confidence.tolist()
+
+def classify(paths, batch_size, workers, model_path, quantized, backend):
+    """Yield (path, class index, confidence) using DataLoader workers and one model"""
+    model = load_backend(backend, model_path, quantized)
+    loader = DataLoader(ImageFileDataset(paths), batch_size=batch_size, num_workers=workers,
+                        pin_memory=device.type == 'cuda', persistent_workers=workers > 0)
+    for xb, batch_paths, ok in loader:
+        preds, confidence = predict_batch(xb, model)
+        for path, pred, conf, good in zip(batch_paths, preds, confidence, ok.tolist()):
+            yield (path, pred, conf) if good else (path, None, None)
+
+def classify_pooled(paths, batch_size, processes, model_path):
+    """Yield (path, class index, confidence) from a shared-weight process pool"""
+    with InferencePool(model_path or MODEL_PATH, processes) as pool:
+        yield from pool.predict_files(paths, batch_size)
+
+def check_pool_args(processes, backend, quantized):
+    """The process pool only runs the eager fp32 model"""
+    if processes and (backend != 'eager' or quantized):
+        raise ValueError('processes only runs the eager fp32 model, not backend={!r} quantized={}'.format(
+            backend, quantized))
+
+def run(root, output, batch_size=64, workers=os.cpu_count(), model_path=None, resume=True,
+        quantized=QUANTIZED, backend=BACKEND, processes=0):
+    check_pool_args(processes, backend, quantized)
+    paths = scan_images(root)
+    if resume:
+        # appending onto a cut-off last line would corrupt the next record too
+        truncate_partial_line(output)
+        done = completed_paths(output)
+        paths = [p for p in paths if p not in done]
+    elif os.path.exists(output):
+        os.remove(output)
+    print("{} images to classify".format(len(paths)))
+    if not paths:
+        return
+
+    if processes:
+        results = classify_pooled(paths, batch_size, processes, model_path)
+    else:
+        results = classify(paths, batch_size, workers, model_path, quantized, backend)
+    writer = ResultWriter(output)
+    seen = 0
+    try:
+        for path, pred, conf in results:
+            if pred is not None:
+                writer.write({'path': path, 'label': classes[pred], 'confidence': round(conf, 6)})
+            else:
+                writer.write({'path': path, 'label': None, 'confidence': None})
+            seen += 1
+            if seen % batch_size == 0 or seen == len(paths):
+                writer.flush()
+                print("{}/{} images".format(seen, len(paths)), end='\r')
+    finally:
+        writer.close()
+    print()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Classify every leaf image below a directory')
+    parser.add_argument('root', help='directory to scan for jpg/jpeg/png images')
+    parser.add_argument('output', help='results file, .jsonl or .csv')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND)
+    parser.add_argument('--model', help="checkpoint or exported model, defaults to the backend's standard path")
+    parser.add_argument('--quantized', action='store_true', default=QUANTIZED,
+                        help='eager backend only: load the int8 checkpoint from quantize.py (--model or PLANT_QUANTIZED_MODEL_PATH)')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='eager fp32 only: run a process pool sharing one copy of the weights')
+    parser.add_argument('--no-resume', action='store_true', help='start over instead of skipping finished images')
+    args = parser.parse_args()
+    try:
+        check_pool_args(args.processes, args.backend, args.quantized)
+    except ValueError as e:
+        parser.error(str(e))
+    run(args.root, args.output, args.batch_size, args.workers, args.model, not args.no_resume,
+        args.quantized, args.backend, args.processes)
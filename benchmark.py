@@ -0,0 +1,141 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import torch
+from PIL import Image
+from model import build_model
+from preprocess import load_image, to_tensor, INPUT_SIZE
+from disease_info import disease_entry
+
+# (width, height) of the synthetic uploads: already model sized, a webcam
+# frame and a 12 megapixel phone photo
+RESOLUTIONS = [(256, 256), (1280, 720), (4000, 3000)]
+BATCH_SIZES = [1, 8, 32]
+THREADS = sorted({1, 4, os.cpu_count()})
+
+
+# for making a JPEG upload that looks like a photo to the decoder
+def synthetic_jpeg(width, height, rng):
+    # smooth noise compresses like a real photo, unlike white noise
+    small = rng.integers(0, 256, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+def summarize(samples, images_per_sample=1):
+    """Latency percentiles in ms and throughput for a list of timings in seconds"""
+    samples = np.asarray(samples)
+    return {'p50_ms': float(np.percentile(samples, 50) * 1000),
+            'p95_ms': float(np.percentile(samples, 95) * 1000),
+            'p99_ms': float(np.percentile(samples, 99) * 1000),
+            'images_per_sec': float(images_per_sample * len(samples) / samples.sum())}
+
+def time_calls(fn, repeats, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_preprocess(rng, repeats):
+    results = []
+    for width, height in RESOLUTIONS:
+        data = synthetic_jpeg(width, height, rng)
+        image = load_image(data)
+        results.append(dict(stage='decode', resolution='{}x{}'.format(width, height),
+                            **summarize(time_calls(lambda: load_image(data), repeats))))
+        results.append(dict(stage='transform', resolution='{}x{}'.format(width, height),
+                            **summarize(time_calls(lambda: to_tensor(image), repeats))))
+    return results
+
+@torch.inference_mode()
+def bench_forward(model, repeats):
+    results = []
+    for threads in THREADS:
+        torch.set_num_threads(threads)
+        for batch_size in BATCH_SIZES:
+            xb = torch.rand(batch_size, 3, *INPUT_SIZE)
+            results.append(dict(stage='forward', threads=threads, batch_size=batch_size,
+                                **summarize(time_calls(lambda: model(xb), repeats), batch_size)))
+    return results
+
+@torch.inference_mode()
+def bench_postprocess(model, repeats):
+    logits = model(torch.rand(1, 3, *INPUT_SIZE))
+
+    def postprocess():
+        _, preds = torch.max(logits, dim=1)
+        return disease_entry(preds[0].item())
+
+    return [dict(stage='postprocess', **summarize(time_calls(postprocess, repeats)))]
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()}
+
+# for matching a result row with the same row of an earlier run
+def row_key(row):
+    return tuple((k, row[k]) for k in ('stage', 'resolution', 'threads', 'batch_size') if k in row)
+
+def compare(results, baseline, threshold):
+    """Print p50 changes against a baseline run and return the regressed rows"""
+    before = {row_key(row): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = before.get(row_key(row))
+        if old is None:
+            continue
+        change = row['p50_ms'] / old['p50_ms'] - 1
+        marker = ' REGRESSION' if change > threshold else ''
+        print('{:<60} p50 {:8.3f} -> {:8.3f} ms ({:+.1%}){}'.format(
+            str(dict(row_key(row))), old['p50_ms'], row['p50_ms'], change, marker))
+        if marker:
+            regressions.append(row)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the inference path on synthetic data')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--repeats', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help='earlier benchmark JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    model = build_model()  # random weights, timing does not depend on them
+
+    results = bench_preprocess(rng, args.repeats)
+    results += bench_forward(model, args.repeats)
+    results += bench_postprocess(model, args.repeats)
+    for row in results:
+        print(json.dumps(row))
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'repeats': args.repeats, 'results': results}, f, indent=2)
+    print('wrote', args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                sys.exit('benchmark regressed against ' + args.compare)
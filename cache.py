@@ -0,0 +1,126 @@
+import collections
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# optional SQLite file for the on-disk tier
+CACHE_PATH = os.environ.get('PLANT_CACHE_PATH')
+
+# bumped whenever the meaning of a cached value changes; values are
+# [class index, base64 float16 embedding or None]
+CACHE_FORMAT = 1
+
+# disk tier limits: total rows kept, and how long other fingerprints' rows survive
+MAX_DISK_ENTRIES = 1000000
+STALE_AFTER = 30 * 24 * 3600
+# puts between two trims of the disk tier
+_TRIM_EVERY = 1000
+
+# for identifying a model checkpoint by its contents
+@functools.lru_cache(maxsize=None)
+def _file_digest(path, size, mtime):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def checkpoint_fingerprint(path):
+    """sha256 of a checkpoint file, recomputed only when its size or mtime change"""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def image_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class PredictionCache:
+    """Content-addressed cache of predictions keyed by the image bytes
+
+    An in-memory LRU tier holds up to max_entries results; with disk_path
+    set, results are also written to a SQLite file that survives restarts.
+    Every entry is tied to the checkpoint fingerprint, so swapping the
+    model invalidates all of them; on disk, rows are keyed by fingerprint
+    too, so servers running different models can share one file. The
+    disk tier keeps at most max_disk_entries rows, dropping the oldest,
+    and rows of other fingerprints older than stale_after seconds.
+    """
+
+    def __init__(self, fingerprint, max_entries=10000, disk_path=None,
+                 max_disk_entries=MAX_DISK_ENTRIES, stale_after=STALE_AFTER):
+        fingerprint = '{}/v{}'.format(fingerprint, CACHE_FORMAT)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        self.max_disk_entries = max_disk_entries
+        self.puts = 0
+        self.db = None
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS cached_predictions '
+                            '(fingerprint TEXT, key TEXT, value TEXT, created REAL, PRIMARY KEY (fingerprint, key))')
+            self.db.execute('CREATE INDEX IF NOT EXISTS cached_predictions_created ON cached_predictions (created)')
+            # another server may still be using its rows, so only drop old ones
+            self.db.execute('DELETE FROM cached_predictions WHERE fingerprint != ? AND created < ?',
+                            (fingerprint, time.time() - stale_after))
+            self._trim()
+            self.db.commit()
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim(self):
+        """Keep only the newest max_disk_entries rows on disk"""
+        self.db.execute('DELETE FROM cached_predictions WHERE rowid IN '
+                        '(SELECT rowid FROM cached_predictions ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                        (self.max_disk_entries,))
+
+    def get(self, data):
+        """Return the cached prediction for these image bytes, or None"""
+        key = image_key(data)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if self.db is not None:
+                row = self.db.execute('SELECT value FROM cached_predictions WHERE fingerprint = ? AND key = ?',
+                                      (self.fingerprint, key)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, data, value):
+        """Store a JSON-serialisable prediction for these image bytes"""
+        key = image_key(data)
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO cached_predictions VALUES (?, ?, ?, ?)',
+                                (self.fingerprint, key, json.dumps(value), time.time()))
+                self.puts += 1
+                if self.puts % _TRIM_EVERY == 0:
+                    self._trim()
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries),
+                    'hits': self.hits,
+                    'disk_hits': self.disk_hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import time
+import torch
+from torch import nn
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from model import build_model, load_state_dict, checkpoint_width, MODEL_PATH
+from train import load_split
+
+# stage 1 is a slim ResNet9 student written by `python distill.py --widths 0.25`
+HEAD_PATH = os.environ.get('PLANT_CASCADE_HEAD_PATH', 'plant-disease-model-w0.25.pth')
+THRESHOLD = float(os.environ.get('PLANT_CASCADE_THRESHOLD', '0.9'))
+
+
+# early-exit cascade in front of a trained ResNet9
+class CascadeResNet9(nn.Module):
+    """Answers from a slim student when it is confident enough
+
+    The width-0.25 student costs about 1/16 of the full model's FLOPs, so
+    an image that exits early skips ~94% of the work; a deferred image
+    pays for both models, and only those run through the full ResNet9.
+    """
+
+    def __init__(self, full, head, threshold=THRESHOLD):
+        super().__init__()
+        self.full = full
+        self.head = head
+        self.threshold = threshold
+
+    def forward(self, xb):
+        logits = self.head(xb)
+        confidence = F.softmax(logits, dim=1).max(dim=1).values
+        deferred = (confidence < self.threshold).nonzero().squeeze(1)
+        if len(deferred):
+            logits = logits.clone()
+            logits[deferred] = self.full(xb[deferred]).to(logits.dtype)
+        return logits
+
+
+def build_cascade(model_path=MODEL_PATH, head_path=HEAD_PATH, threshold=THRESHOLD):
+    state_dict = load_state_dict(model_path)
+    if checkpoint_width(state_dict) != 1:
+        raise ValueError('the cascade only supports the full-width ResNet9, '
+                         '{} is a width {} student'.format(model_path, checkpoint_width(state_dict)))
+    return CascadeResNet9(build_model(state_dict), build_model(load_state_dict(head_path)), threshold).eval()
+
+@torch.inference_mode()
+def collect(cascade, loader):
+    """Run both stages on every image once, timing each stage"""
+    confidence, early_preds, full_preds, labels = [], [], [], []
+    stage1_time = stage2_time = 0.0
+    for images, batch_labels in loader:
+        start = time.perf_counter()
+        early = F.softmax(cascade.head(images), dim=1)
+        stage1_time += time.perf_counter() - start
+        start = time.perf_counter()
+        full = cascade.full(images)
+        stage2_time += time.perf_counter() - start
+        conf, pred = early.max(dim=1)
+        confidence.append(conf)
+        early_preds.append(pred)
+        full_preds.append(full.argmax(dim=1))
+        labels.append(batch_labels)
+    n = sum(len(l) for l in labels)
+    return {'confidence': torch.cat(confidence), 'early_preds': torch.cat(early_preds),
+            'full_preds': torch.cat(full_preds), 'labels': torch.cat(labels),
+            'stage1_ms': stage1_time / n * 1000, 'stage2_ms': stage2_time / n * 1000}
+
+def sweep_thresholds(stats, thresholds):
+    """Accuracy and expected mean latency of the cascade at each threshold"""
+    labels = stats['labels']
+    full_accuracy = (stats['full_preds'] == labels).float().mean().item()
+    rows = []
+    for threshold in thresholds:
+        exits = stats['confidence'] >= threshold
+        preds = torch.where(exits, stats['early_preds'], stats['full_preds'])
+        exit_rate = exits.float().mean().item()
+        rows.append({'threshold': threshold,
+                     'accuracy': (preds == labels).float().mean().item(),
+                     'full_accuracy': full_accuracy,
+                     'exit_rate': exit_rate,
+                     'mean_ms': stats['stage1_ms'] + (1 - exit_rate) * stats['stage2_ms'],
+                     'full_ms': stats['stage2_ms']})
+    return rows
+
+def choose_threshold(rows, tolerance):
+    """Fastest threshold whose accuracy is within tolerance of the full model"""
+    ok = [row for row in rows if row['accuracy'] >= row['full_accuracy'] - tolerance]
+    return min(ok, key=lambda row: row['mean_ms']) if ok else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tune the early-exit threshold of the cascade')
+    parser.add_argument('data_dir', help='dataset root containing valid/ (images or shards)')
+    parser.add_argument('--model', default=MODEL_PATH, help='full ResNet9 state_dict checkpoint')
+    parser.add_argument('--head', default=HEAD_PATH, help='slim student checkpoint from distill.py')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--tolerance', type=float, default=0.005, help='accuracy the cascade may give up')
+    parser.add_argument('--output', help='write the threshold sweep to this JSON file')
+    args = parser.parse_args()
+
+    cascade = build_cascade(args.model, args.head)
+    valid_dl = DataLoader(load_split(os.path.join(args.data_dir, 'valid')), batch_size=args.batch_size,
+                          num_workers=args.workers)
+    rows = sweep_thresholds(collect(cascade, valid_dl), [i / 100 for i in range(50, 100)] + [0.995, 0.999])
+    for row in rows:
+        print('threshold {threshold:.3f}: accuracy {accuracy:.4f} (full {full_accuracy:.4f}), '
+              'exit rate {exit_rate:.3f}, {mean_ms:.2f} ms/image (full {full_ms:.2f})'.format(**row))
+    best = choose_threshold(rows, args.tolerance)
+    if best:
+        print('use PLANT_CASCADE_THRESHOLD={threshold} for {mean_ms:.2f} ms/image at accuracy {accuracy:.4f}'.format(**best))
+    else:
+        print('no threshold keeps accuracy within', args.tolerance)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': rows, 'best': best}, f, indent=2)
@@ -0,0 +1,20 @@
+import functools
+import json
+import os
+from model import classes
+
+# one entry per class, in the same order as model.classes
+KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'disease_info.json')
+
+@functools.lru_cache(maxsize=None)
+def knowledge_base(path=KB_PATH):
+    """Disease entries indexed by class index, read once per process"""
+    with open(path, encoding='utf-8') as f:
+        entries = tuple(json.load(f))
+    if [entry['class'] for entry in entries] != classes:
+        raise ValueError('{} does not list the model classes in order'.format(path))
+    return entries
+
+def disease_entry(index):
+    """description, symptoms, diagnosis and video_url for a class index"""
+    return knowledge_base()[index]
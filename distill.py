@@ -0,0 +1,181 @@
+import argparse
+import functools
+import json
+import os
+import statistics
+import time
+import torch
+from torch import nn
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from model import ResNet9, classes, build_model, load_state_dict, MODEL_PATH
+from preprocess import INPUT_SIZE
+from train import load_split, fit_OneCycle, save_checkpoint
+from evaluate import evaluate_model
+
+# the ConvBlock feeding each ConvBlock of ResNet9 (None: the image)
+INPUTS = {'conv1': None, 'conv2': 'conv1', 'res1.0': 'conv2', 'res1.1': 'res1.0',
+          'conv3': 'conv2', 'conv4': 'conv3', 'res2.0': 'conv4', 'res2.1': 'res2.0'}
+# residual adds: these blocks' outputs are summed, so they keep the same channels
+TIED = {'conv2': ['conv2', 'res1.1'], 'res1.1': ['conv2', 'res1.1'],
+        'conv4': ['conv4', 'res2.1'], 'res2.1': ['conv4', 'res2.1']}
+
+
+def student_path(width, directory='.'):
+    return os.path.join(directory, 'plant-disease-model-w{}.pth'.format(width))
+
+# for ranking the output channels of a ConvBlock
+def channel_importance(block):
+    """L1 norm of each filter scaled by its BatchNorm gain"""
+    conv, bn = block[0], block[1]
+    return conv.weight.abs().sum(dim=(1, 2, 3)) * bn.weight.abs()
+
+@torch.no_grad()
+def prune(teacher, width):
+    """ResNet9 of the given width initialised with the teacher's strongest channels
+
+    Each block keeps its highest-importance filters and the matching input
+    channels of the next block. Blocks joined by a residual add are ranked
+    together so both sides of the add keep the same channels.
+    """
+    student = ResNet9(3, len(classes), width)
+    keep = {}
+    for name in INPUTS:
+        if name in keep:
+            continue
+        group = TIED.get(name, [name])
+        scores = sum(channel_importance(teacher.get_submodule(member)) for member in group)
+        n = student.get_submodule(name)[0].out_channels
+        kept = scores.topk(n).indices.sort().values
+        for member in group:
+            keep[member] = kept
+    teacher_state = teacher.state_dict()
+    state = {}
+    for name, source in INPUTS.items():
+        out = keep[name]
+        conv = teacher_state[name + '.0.weight'][out]
+        state[name + '.0.weight'] = conv if source is None else conv[:, keep[source]]
+        state[name + '.0.bias'] = teacher_state[name + '.0.bias'][out]
+        for key in ('weight', 'bias', 'running_mean', 'running_var'):
+            state[name + '.1.' + key] = teacher_state[name + '.1.' + key][out]
+        state[name + '.1.num_batches_tracked'] = teacher_state[name + '.1.num_batches_tracked']
+    state['classifier.2.weight'] = teacher_state['classifier.2.weight'][:, keep['conv4']]
+    state['classifier.2.bias'] = teacher_state['classifier.2.bias']
+    student.load_state_dict({key: value.clone() for key, value in state.items()})
+    return student
+
+def distillation_step(student, teacher, temperature, alpha, batch):
+    """Cross-entropy on the labels blended with KL to the teacher's soft targets"""
+    images, labels = batch
+    with torch.no_grad():
+        teacher_logits = teacher(images)
+    logits = student(images)
+    soft = F.kl_div(F.log_softmax(logits / temperature, dim=1), F.softmax(teacher_logits / temperature, dim=1),
+                    reduction='batchmean') * temperature ** 2
+    return alpha * soft + (1 - alpha) * F.cross_entropy(logits, labels)
+
+def distill(teacher, width, train_loader, val_loader, epochs=5, max_lr=0.01, temperature=4.0, alpha=0.9, **fit_args):
+    """Prune the teacher to width and fine-tune the result with fit_OneCycle"""
+    student = prune(teacher, width)
+    teacher.to(memory_format=torch.channels_last)
+    step = functools.partial(distillation_step, student, teacher, temperature, alpha)
+    fit_OneCycle(epochs, max_lr, student, train_loader, val_loader, step=step, **fit_args)
+    return student
+
+
+# for the cost side of the comparison table
+def count_flops(model, size=INPUT_SIZE):
+    """FLOPs of one forward pass on one image, counting a multiply-add as 2"""
+    macs = []
+
+    def hook(module, inputs, output):
+        if isinstance(module, nn.Conv2d):
+            kernel = module.in_channels // module.groups * module.kernel_size[0] * module.kernel_size[1]
+            macs.append(output.numel() * kernel)
+        else:
+            macs.append(module.in_features * module.out_features)
+
+    handles = [m.register_forward_hook(hook) for m in model.modules() if isinstance(m, (nn.Conv2d, nn.Linear))]
+    try:
+        with torch.inference_mode():
+            model(torch.zeros(1, 3, *size))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return 2 * sum(macs)
+
+@torch.inference_mode()
+def latency_ms(model, batch_size=1, runs=30, size=INPUT_SIZE):
+    """Median CPU latency of one batch in milliseconds"""
+    xb = torch.rand(batch_size, 3, *size)
+    for _ in range(3):
+        model(xb)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(xb)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def compare(variants, loader):
+    """FLOPs, parameters, latency and accuracy for each named model"""
+    rows = []
+    for name, model in variants.items():
+        rows.append({'variant': name,
+                     'gflops': count_flops(model) / 1e9,
+                     'params': sum(p.numel() for p in model.parameters()),
+                     'latency_ms': latency_ms(model),
+                     'accuracy': evaluate_model(model, loader).report()['accuracy']})
+    base = rows[0]
+    for row in rows:
+        row['cost_ratio'] = base['gflops'] / row['gflops']
+        row['accuracy_drop'] = base['accuracy'] - row['accuracy']
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prune and distill slimmer ResNet9 students from a checkpoint')
+    parser.add_argument('data_dir', help='dataset root containing train/ and valid/ (images or shards)')
+    parser.add_argument('--model', default=MODEL_PATH, help='teacher state_dict checkpoint')
+    parser.add_argument('--widths', type=float, nargs='+', default=[0.5, 0.25])
+    parser.add_argument('--output-dir', default='.', help='where to write plant-disease-model-w<width>.pth')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--max-lr', type=float, default=0.01)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.9, help='weight of the distillation loss')
+    parser.add_argument('--grad-clip', type=float, default=0.1)
+    parser.add_argument('--weight-decay', type=float, default=1e-4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--bf16', action='store_true', help='bfloat16 autocast on CPU')
+    parser.add_argument('--skip-training', action='store_true', help='only compare existing students')
+    parser.add_argument('--report', help='write the comparison table to this JSON file')
+    args = parser.parse_args()
+
+    teacher = build_model(load_state_dict(args.model))
+    valid_dl = DataLoader(load_split(os.path.join(args.data_dir, 'valid')), batch_size=args.batch_size,
+                          num_workers=args.workers)
+    if not args.skip_training:
+        os.makedirs(args.output_dir, exist_ok=True)
+        train_dl = DataLoader(load_split(os.path.join(args.data_dir, 'train')), batch_size=args.batch_size,
+                              shuffle=True, drop_last=True, num_workers=args.workers)
+        for width in args.widths:
+            print('distilling width', width)
+            student = distill(teacher, width, train_dl, valid_dl, args.epochs, args.max_lr, args.temperature,
+                              args.alpha, weight_decay=args.weight_decay, grad_clip=args.grad_clip,
+                              opt_func=torch.optim.Adam, bf16=args.bf16)
+            path = student_path(width, args.output_dir)
+            save_checkpoint(student, path)
+            print('wrote', path)
+
+    variants = {'1.0': teacher.to(memory_format=torch.contiguous_format)}
+    for width in args.widths:
+        variants[str(width)] = build_model(load_state_dict(student_path(width, args.output_dir)))
+    rows = compare(variants, valid_dl)
+    print('{:>7} {:>8} {:>10} {:>11} {:>9} {:>6}'.format('width', 'GFLOPs', 'params', 'latency ms', 'accuracy', 'cost'))
+    for row in rows:
+        print('{variant:>7} {gflops:8.3f} {params:10,d} {latency_ms:11.2f} {accuracy:9.4f} {cost_ratio:5.1f}x'.format(**row))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print('wrote', args.report)
@@ -0,0 +1,248 @@
+import argparse
+import base64
+import json
+import os
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from model import ResNet9, device, to_device, load_model, MODEL_PATH
+from cache import checkpoint_fingerprint
+from preprocess import preprocess, image_folder
+
+# directory written by `python embeddings.py build`, read by the app and serve.py
+INDEX_PATH = os.environ.get('PLANT_SIMILAR_INDEX', 'similar-cases')
+# similar cases shown per prediction
+SIMILAR_K = 4
+
+
+# for turning images into unit-length feature vectors
+@torch.inference_mode()
+def embed_images(model, xb):
+    """L2-normalised embeddings for one N x 3 x 256 x 256 batch, as float32 numpy"""
+    return F.normalize(model.embed(to_device(xb, device)).float(), dim=1).cpu().numpy()
+
+def supports_embeddings(model):
+    """Only the float eager ResNet9 exposes its pooled features"""
+    return type(model) is ResNet9
+
+@torch.inference_mode()
+def forward_with_embeddings(model, xb):
+    """Logits and (for the eager ResNet9, else None) embeddings from one forward pass"""
+    xb = to_device(xb, device)
+    if not supports_embeddings(model):
+        return model(xb), None
+    # run the whole model so hooks on its blocks (e.g. metrics) still fire,
+    # and pick the pooled features up on their way into the linear layer
+    captured = []
+    handle = model.classifier[1].register_forward_hook(lambda module, args, output: captured.append(output))
+    try:
+        logits = model(xb)
+    finally:
+        handle.remove()
+    return logits, F.normalize(captured[0].float(), dim=1).cpu().numpy()
+
+# for storing an embedding next to its prediction in the JSON cache
+def encode_embedding(vector):
+    return base64.b64encode(np.asarray(vector, dtype=np.float16).tobytes()).decode('ascii')
+
+def decode_embedding(text):
+    return np.frombuffer(base64.b64decode(text), dtype=np.float16).astype(np.float32)
+
+def extract_embeddings(model, loader):
+    """Yield (embeddings, labels) for each batch of the loader"""
+    for images, labels in loader:
+        yield embed_images(model, images), labels.numpy()
+
+def spherical_kmeans(vectors, nlist, iterations=10, sample=256, seed=0):
+    """Unit-length centroids for nlist clusters, fitted on a sample of the vectors"""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    rows = np.sort(rng.choice(n, min(n, nlist * sample), replace=False))
+    points = np.asarray(vectors[rows])
+    centroids = points[rng.choice(len(points), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = (points @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # restart empty clusters from random points
+        sums[empty] = points[rng.choice(len(points), empty.sum())]
+        norms[empty] = 1
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+def _top_k(scores, k):
+    """Indices of the k best scores per row, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, best, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(best, order, axis=1)
+
+
+class VectorIndex:
+    """Cosine-similarity index over the embeddings of a reference library
+
+    Vectors are stored unit-length, so cosine similarity is a dot product.
+    search() is exact by default: one matrix product over the whole
+    library, in chunks so a memory-mapped index never needs to fit in RAM.
+    After build_ivf() it can instead probe only the nprobe inverted lists
+    whose centroids are closest to the query, which keeps queries fast
+    when the library grows to millions of images.
+    """
+
+    def __init__(self, vectors, paths, labels, fingerprint=None):
+        self.vectors = vectors
+        self.paths = paths
+        self.labels = labels
+        self.fingerprint = fingerprint
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def build_ivf(self, nlist=None, iterations=10):
+        """Cluster the vectors into nlist inverted lists (default ~sqrt(N))"""
+        nlist = min(len(self), nlist or max(1, int(np.sqrt(len(self)))))
+        self.centroids = spherical_kmeans(self.vectors, nlist, iterations)
+        assignment = np.empty(len(self), dtype=np.int64)
+        for start in range(0, len(self), 65536):
+            block = np.asarray(self.vectors[start:start + 65536])
+            assignment[start:start + len(block)] = (block @ self.centroids.T).argmax(axis=1)
+        # rows grouped by list: list i is order[offsets[i]:offsets[i + 1]]
+        self.order = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+        return self
+
+    def search_exact(self, queries, k=5, chunk=65536):
+        scores, rows = [], []
+        for start in range(0, len(self), chunk):
+            block = np.asarray(self.vectors[start:start + chunk])
+            block_scores = queries @ block.T
+            best = _top_k(block_scores, k)
+            scores.append(np.take_along_axis(block_scores, best, axis=1))
+            rows.append(best + start)
+        scores, rows = np.concatenate(scores, axis=1), np.concatenate(rows, axis=1)
+        best = _top_k(scores, k)
+        return np.take_along_axis(rows, best, axis=1), np.take_along_axis(scores, best, axis=1)
+
+    def search_ivf(self, queries, k=5, nprobe=8):
+        results_rows, results_scores = [], []
+        probes = _top_k(queries @ self.centroids.T, nprobe)
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+            candidates.sort()  # sequential reads from a memory-mapped index
+            scores = np.asarray(self.vectors[candidates]) @ query
+            best = _top_k(scores[None], k)[0]
+            results_rows.append(candidates[best])
+            results_scores.append(scores[best])
+        return results_rows, results_scores
+
+    def search(self, queries, k=5, nprobe=None):
+        """Best k matches per query as lists of {'path', 'label', 'score'} dicts
+
+        nprobe switches to the approximate search when the IVF lists exist.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if nprobe and self.centroids is not None:
+            rows, scores = self.search_ivf(queries, k, nprobe)
+        else:
+            rows, scores = self.search_exact(queries, k)
+        return [[{'path': self.paths[row], 'label': self.labels[row], 'score': float(score)}
+                 for row, score in zip(query_rows, query_scores)]
+                for query_rows, query_scores in zip(rows, scores)]
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'vectors.npy'), np.asarray(self.vectors, dtype=np.float32))
+        if self.centroids is not None:
+            np.savez(os.path.join(path, 'ivf.npz'), centroids=self.centroids, order=self.order,
+                     offsets=self.offsets)
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'paths': self.paths, 'labels': self.labels}, f)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, fingerprint=None):
+        """Memory-map a saved index; fingerprint guards against a different checkpoint"""
+        with open(os.path.join(path, 'index.json')) as f:
+            meta = json.load(f)
+        if fingerprint and meta['fingerprint'] != fingerprint:
+            raise ValueError('index {} was built with a different checkpoint'.format(path))
+        index = cls(np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r'),
+                    meta['paths'], meta['labels'], meta['fingerprint'])
+        ivf_path = os.path.join(path, 'ivf.npz')
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                index.centroids, index.order, index.offsets = ivf['centroids'], ivf['order'], ivf['offsets']
+        return index
+
+
+def load_matching_index(model_path=MODEL_PATH, path=INDEX_PATH):
+    """The saved index if it exists and was built from model_path, else None"""
+    if not os.path.isdir(path):
+        return None
+    try:
+        return VectorIndex.load(path, checkpoint_fingerprint(model_path))
+    except ValueError as e:
+        # neighbours from another embedding space would be silently wrong
+        print('ignoring similar-case index:', e)
+        return None
+
+def build_index(library, model_path=MODEL_PATH, batch_size=64, workers=0):
+    """Embed every image of a class-per-directory library of confirmed cases"""
+    dataset = image_folder(library)
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=workers)
+    model = load_model(model_path, quantized=False)
+    vectors = np.empty((len(dataset), model.classifier[2].in_features), dtype=np.float32)
+    labels = []
+    start = time.perf_counter()
+    for embeddings, targets in extract_embeddings(model, loader):
+        vectors[len(labels):len(labels) + len(embeddings)] = embeddings
+        labels.extend(dataset.classes[t] for t in targets)
+    print('embedded {} images in {:.1f}s'.format(len(labels), time.perf_counter() - start))
+    paths = [path for path, _ in dataset.samples]
+    return VectorIndex(vectors, paths, labels, checkpoint_fingerprint(model_path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Similar-case index over a library of confirmed images')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='embed a class-per-directory library')
+    build.add_argument('library')
+    build.add_argument('--ivf', type=int, nargs='?', const=0,
+                       help='also build IVF lists for approximate search (default count ~sqrt(N))')
+    build.add_argument('--batch-size', type=int, default=64)
+    build.add_argument('--workers', type=int, default=os.cpu_count())
+    query = commands.add_parser('query', help='find the closest library images')
+    query.add_argument('images', nargs='+')
+    query.add_argument('-k', type=int, default=5)
+    query.add_argument('--nprobe', type=int, help='approximate search over this many IVF lists')
+    for command in (build, query):
+        command.add_argument('--index', default=INDEX_PATH)
+        command.add_argument('--model', default=MODEL_PATH, help='state_dict checkpoint')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = build_index(args.library, args.model, args.batch_size, args.workers)
+        if args.ivf is not None:
+            index.build_ivf(args.ivf or None)
+        print('wrote', index.save(args.index))
+    else:
+        index = VectorIndex.load(args.index, checkpoint_fingerprint(args.model))
+        queries = embed_images(load_model(args.model, quantized=False),
+                               torch.stack([preprocess(path) for path in args.images]))
+        start = time.perf_counter()
+        results = index.search(queries, args.k, args.nprobe)
+        elapsed = (time.perf_counter() - start) * 1000
+        for path, matches in zip(args.images, results):
+            print(path)
+            for match in matches:
+                print('  {score:.3f}  {label}  {path}'.format(**match))
+        print('{} queries over {} vectors in {:.2f} ms'.format(len(queries), len(index), elapsed))
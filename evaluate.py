@@ -0,0 +1,132 @@
+import argparse
+import json
+import multiprocessing
+import os
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, Subset
+from model import classes, build_model, load_state_dict
+from train import load_split
+
+TOPK = (1, 3, 5)
+
+
+class StreamingEvaluator:
+    """Accumulates a confusion matrix and top-k hits without host syncs
+
+    Everything stays a tensor until report(), so update() never blocks
+    on .item(). Evaluators built on different shards of a dataset can be
+    merged, and the totals do not depend on how the batches were split.
+    """
+
+    def __init__(self, num_classes=len(classes), topk=TOPK):
+        self.num_classes = num_classes
+        self.topk = topk
+        self.confusion = torch.zeros(num_classes, num_classes, dtype=torch.int64)
+        self.topk_hits = torch.zeros(len(topk), dtype=torch.int64)
+        self.loss_sum = torch.zeros((), dtype=torch.float64)
+
+    def update(self, logits, labels):
+        logits = logits.float()
+        preds = logits.argmax(dim=1)
+        # rows are true classes, columns predicted classes
+        self.confusion += torch.bincount(labels * self.num_classes + preds,
+                                         minlength=self.num_classes ** 2).view(self.num_classes, self.num_classes)
+        ranked = logits.topk(max(self.topk), dim=1).indices
+        hit_rank = (ranked == labels[:, None]).int().cumsum(dim=1)
+        self.topk_hits += hit_rank[:, [k - 1 for k in self.topk]].sum(dim=0)
+        self.loss_sum += F.cross_entropy(logits, labels, reduction='sum').double()
+
+    def merge(self, other):
+        self.confusion += other.confusion
+        self.topk_hits += other.topk_hits
+        self.loss_sum += other.loss_sum
+        return self
+
+    def state(self):
+        return {'confusion': self.confusion, 'topk_hits': self.topk_hits, 'loss_sum': self.loss_sum}
+
+    @classmethod
+    def from_state(cls, state, topk=TOPK):
+        evaluator = cls(state['confusion'].shape[0], topk)
+        evaluator.confusion = state['confusion']
+        evaluator.topk_hits = state['topk_hits']
+        evaluator.loss_sum = state['loss_sum']
+        return evaluator
+
+    def report(self, class_names=classes):
+        cm = self.confusion.double()
+        total = cm.sum()
+        true_positive = cm.diag()
+        support = cm.sum(dim=1)
+        predicted = cm.sum(dim=0)
+        precision = torch.where(predicted > 0, true_positive / predicted, torch.zeros_like(cm[0]))
+        recall = torch.where(support > 0, true_positive / support, torch.zeros_like(cm[0]))
+        denom = precision + recall
+        f1 = torch.where(denom > 0, 2 * precision * recall / denom, torch.zeros_like(cm[0]))
+        weights = support / total
+        return {'images': int(total),
+                'loss': float(self.loss_sum / total),
+                'accuracy': float(true_positive.sum() / total),
+                'topk_accuracy': {'top{}'.format(k): float(hits / total)
+                                  for k, hits in zip(self.topk, self.topk_hits)},
+                'macro': {'precision': float(precision.mean()), 'recall': float(recall.mean()),
+                          'f1': float(f1.mean())},
+                'weighted': {'precision': float((precision * weights).sum()),
+                             'recall': float((recall * weights).sum()),
+                             'f1': float((f1 * weights).sum())},
+                'per_class': {name: {'precision': float(p), 'recall': float(r), 'f1': float(f), 'support': int(s)}
+                              for name, p, r, f, s in zip(class_names, precision, recall, f1, support)},
+                'confusion_matrix': self.confusion.tolist()}
+
+
+@torch.inference_mode()
+def evaluate_model(model, loader):
+    evaluator = StreamingEvaluator()
+    for images, labels in loader:
+        evaluator.update(model(images), labels)
+    return evaluator
+
+def _evaluate_shard(args):
+    """Worker: evaluate every num_shards-th image of the dataset"""
+    checkpoint, data_dir, shard, num_shards, batch_size, threads = args
+    torch.set_num_threads(threads)
+    dataset = load_split(data_dir)
+    subset = Subset(dataset, range(shard, len(dataset), num_shards))
+    model = build_model(load_state_dict(checkpoint))
+    return evaluate_model(model, DataLoader(subset, batch_size=batch_size)).state()
+
+def evaluate_checkpoint(checkpoint, data_dir, num_shards=1, batch_size=64):
+    """Full validation report, splitting the dataset across worker processes"""
+    threads = max(1, (os.cpu_count() or 1) // num_shards)
+    jobs = [(checkpoint, data_dir, shard, num_shards, batch_size, threads) for shard in range(num_shards)]
+    if num_shards == 1:
+        states = [_evaluate_shard(jobs[0])]
+    else:
+        with multiprocessing.get_context('spawn').Pool(num_shards) as pool:
+            states = pool.map(_evaluate_shard, jobs)
+    evaluator = StreamingEvaluator.from_state(states[0])
+    for state in states[1:]:
+        evaluator.merge(StreamingEvaluator.from_state(state))
+    return evaluator.report()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validation report for one or more checkpoints')
+    parser.add_argument('data_dir', help='class-per-directory images or shards.py output')
+    parser.add_argument('checkpoints', nargs='+', help='state_dict checkpoints to evaluate')
+    parser.add_argument('--shards', type=int, default=1, help='worker processes to split the dataset across')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--output', help='write all reports to this JSON file')
+    args = parser.parse_args()
+
+    reports = {}
+    for checkpoint in args.checkpoints:
+        report = evaluate_checkpoint(checkpoint, args.data_dir, args.shards, args.batch_size)
+        reports[checkpoint] = report
+        print('{}: loss {:.4f}, accuracy {:.4f}, top3 {:.4f}, macro f1 {:.4f}'.format(
+            checkpoint, report['loss'], report['accuracy'], report['topk_accuracy']['top3'], report['macro']['f1']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print('wrote', args.output)
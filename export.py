@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+import torch
+from model import build_model, load_state_dict, MODEL_PATH
+from preprocess import INPUT_SIZE
+from backends import OnnxModel, check_equivalence, load_torchscript, TORCHSCRIPT_PATH, ONNX_PATH
+
+# for writing a frozen TorchScript module
+def export_torchscript(model, path=TORCHSCRIPT_PATH, batch_size=2):
+    example = torch.rand(batch_size, 3, *INPUT_SIZE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    # freezing inlines the weights as constants and folds BatchNorm into the convs;
+    # optimize_for_inference is machine-specific and its output doesn't reload,
+    # so load_torchscript applies it instead
+    torch.jit.freeze(traced).save(path)
+    return path
+
+# for writing an ONNX graph with a dynamic batch dimension
+def export_onnx(model, path=ONNX_PATH, opset=17, batch_size=2):
+    example = torch.rand(batch_size, 3, *INPUT_SIZE)
+    torch.onnx.export(model, example, path,
+                      input_names=['images'],
+                      output_names=['logits'],
+                      dynamic_axes={'images': {0: 'batch'}, 'logits': {0: 'batch'}},
+                      opset_version=opset)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export ResNet9 to TorchScript and ONNX')
+    parser.add_argument('--model', default=MODEL_PATH, help='state_dict checkpoint')
+    parser.add_argument('--torchscript', default=TORCHSCRIPT_PATH)
+    parser.add_argument('--onnx', default=ONNX_PATH)
+    parser.add_argument('--check-batch-size', type=int, default=5,
+                        help='batch size of the equivalence check, different from the traced one')
+    parser.add_argument('--atol', type=float, default=1e-3)
+    args = parser.parse_args()
+
+    model = build_model(load_state_dict(args.model))
+    print('wrote', export_torchscript(model, args.torchscript))
+    print('wrote', export_onnx(model, args.onnx))
+
+    report = check_equivalence(model,
+                               {'torchscript': load_torchscript(args.torchscript),
+                                'onnx': OnnxModel(args.onnx)},
+                               torch.rand(args.check_batch_size, 3, *INPUT_SIZE),
+                               args.atol)
+    print(json.dumps(report, indent=2))
+    if not all(r['ok'] for r in report.values()):
+        sys.exit('exported models do not match the eager model')
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import time
+import aiohttp
+
+# for nearest-rank percentiles over a sorted list of latencies
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+async def worker(session, url, data, remaining, latencies):
+    while remaining:
+        remaining.pop()
+        start = time.perf_counter()
+        async with session.post(url, data=data) as response:
+            await response.read()
+            response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+async def run(url, image_path, requests, concurrency):
+    """Fire requests at the server from concurrency parallel clients"""
+    with open(image_path, 'rb') as f:
+        data = f.read()
+    remaining = list(range(requests))
+    latencies = []
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[worker(session, url.rstrip('/') + '/predict', data, remaining, latencies)
+                               for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        async with session.get(url.rstrip('/') + '/stats') as response:
+            stats = await response.json()
+    latencies.sort()
+    print("{} requests in {:.2f}s, {:.1f} req/s".format(len(latencies), elapsed, len(latencies) / elapsed))
+    print("latency ms p50: {:.1f} p95: {:.1f} p99: {:.1f}".format(
+        *[percentile(latencies, q) * 1000 for q in (50, 95, 99)]))
+    print("server mean batch size: {:.2f}".format(stats['mean_batch_size']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load generator for serve.py')
+    parser.add_argument('image', help='image file to upload on every request')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.image, args.requests, args.concurrency))
@@ -0,0 +1,186 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# instrumentation is off unless PLANT_METRICS=1; disabled timers cost one
+# function call returning a shared no-op context manager
+ENABLED = os.environ.get('PLANT_METRICS') == '1'
+METRICS_PORT = os.environ.get('PLANT_METRICS_PORT')
+# seconds between snapshot log lines, 0 disables them
+LOG_INTERVAL = float(os.environ.get('PLANT_METRICS_LOG_INTERVAL', '60'))
+
+# upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the ResNet9 blocks that get forward hooks
+LAYERS = ['conv1', 'conv2', 'res1', 'conv3', 'conv4', 'res2', 'classifier']
+
+logger = logging.getLogger('plant.metrics')
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+# histograms by (metric name, label name, label value)
+_histograms = {}
+_lock = threading.Lock()
+
+def observe(metric, label, value, seconds):
+    with _lock:
+        histogram = _histograms.get((metric, label, value))
+        if histogram is None:
+            histogram = _histograms[(metric, label, value)] = Histogram()
+        histogram.observe(seconds)
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe('plant_stage_seconds', 'stage', self.stage, time.perf_counter() - self.start)
+        return False
+
+_disabled = contextlib.nullcontext()
+
+def timed(stage):
+    """Context manager recording the wall time of one pipeline stage"""
+    if not ENABLED:
+        return _disabled
+    return _StageTimer(stage)
+
+
+# for timing each ResNet9 block with forward hooks
+def instrument_model(model, layers=LAYERS):
+    """Register per-layer timing hooks and return their handles
+
+    Does nothing for non-eager backends or when metrics are disabled,
+    so the hooks never sit on the hot path unless asked for.
+    """
+    handles = []
+    if not ENABLED or not hasattr(model, 'register_forward_hook'):
+        return handles
+    if getattr(model, '_metrics_hooks', None):
+        # already instrumented by an earlier call, e.g. a Streamlit rerun
+        return model._metrics_hooks
+    starts = threading.local()
+
+    def make_hooks(name):
+        def pre_hook(module, args):
+            setattr(starts, name, time.perf_counter())
+
+        def hook(module, args, output):
+            observe('plant_layer_seconds', 'layer', name, time.perf_counter() - getattr(starts, name))
+
+        return pre_hook, hook
+
+    for name in layers:
+        module = getattr(model, name, None)
+        if module is None:
+            continue
+        pre_hook, hook = make_hooks(name)
+        handles.append(module.register_forward_pre_hook(pre_hook))
+        handles.append(module.register_forward_hook(hook))
+    model._metrics_hooks = handles
+    return handles
+
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format"""
+    with _lock:
+        items = sorted(_histograms.items())
+    lines = []
+    for metric in sorted({key[0] for key, _ in items}):
+        lines.append('# TYPE {} histogram'.format(metric))
+        for (name, label, value), histogram in items:
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append('{}_bucket{{{}="{}",le="{}"}} {}'.format(metric, label, value, bound, cumulative))
+            lines.append('{}_sum{{{}="{}"}} {}'.format(metric, label, value, histogram.sum))
+            lines.append('{}_count{{{}="{}"}} {}'.format(metric, label, value, histogram.count))
+    return '\n'.join(lines) + '\n'
+
+def snapshot():
+    """Count, total and mean seconds of every stage and layer"""
+    with _lock:
+        return {'{}:{}'.format(label, value): {'count': h.count,
+                                               'sum_s': h.sum,
+                                               'mean_ms': h.sum / h.count * 1000 if h.count else 0}
+                for (_, label, value), h in sorted(_histograms.items())}
+
+def log_snapshot():
+    """Emit the current snapshot as one structured JSON log line"""
+    logger.info(json.dumps({'metrics': snapshot()}))
+
+_log_thread = None
+
+def start_snapshot_logger(interval=LOG_INTERVAL):
+    """Log a snapshot every interval seconds from a daemon thread, once per process
+
+    Lines go to stderr unless the application has already given the
+    plant.metrics logger a handler of its own.
+    """
+    global _log_thread
+    if _log_thread is not None or not ENABLED or interval <= 0:
+        return _log_thread
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    def run():
+        while True:
+            time.sleep(interval)
+            log_snapshot()
+
+    _log_thread = threading.Thread(target=run, daemon=True)
+    _log_thread.start()
+    return _log_thread
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+
+def start_http_server(port=METRICS_PORT):
+    """Serve /metrics from a daemon thread, once per process"""
+    global _server
+    if _server is None and ENABLED and port:
+        _server = ThreadingHTTPServer(('', int(port)), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
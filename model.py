@@ -0,0 +1,231 @@
+import os
+import time
+import torch
+from torch import nn
+import torch.nn.functional as F
+import metrics
+
+# for moving data into GPU (if available)
+def get_default_device():
+    """Pick GPU if available, else CPU"""
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    else:
+        return torch.device("cpu")
+
+# for moving data to device (CPU or GPU)
+def to_device(data, device):
+    """Move tensor(s) to chosen device"""
+    if isinstance(data, (list,tuple)):
+        return [to_device(x, device) for x in data]
+    return data.to(device, non_blocking=True)
+
+device = get_default_device()
+
+# for calculating the accuracy
+def accuracy(outputs, labels):
+    _, preds = torch.max(outputs, dim=1)
+    return (preds == labels).float().mean()  # stays a tensor, no host sync
+
+
+# base class for the model
+class ImageClassificationBase(nn.Module):
+
+    def training_step(self, batch):
+        images, labels = batch
+        out = self(images)                  # Generate predictions
+        loss = F.cross_entropy(out, labels) # Calculate loss
+        return loss
+
+    def validation_step(self, batch):
+        images, labels = batch
+        out = self(images)                   # Generate prediction
+        loss = F.cross_entropy(out, labels)  # Calculate loss
+        acc = accuracy(out, labels)          # Calculate accuracy
+        return {"val_loss": loss.detach(), "val_accuracy": acc, "batch_size": len(labels)}
+
+    def validation_epoch_end(self, outputs):
+        batch_losses = [x["val_loss"] for x in outputs]
+        batch_accuracy = [x["val_accuracy"] for x in outputs]
+        # weight by batch size so a short last batch counts for what it holds
+        weights = torch.tensor([x["batch_size"] for x in outputs], dtype=torch.float)
+        weights = weights / weights.sum()
+        epoch_loss = (torch.stack(batch_losses).float() * weights).sum()       # Combine loss
+        epoch_accuracy = (torch.stack(batch_accuracy) * weights).sum()
+        return {"val_loss": epoch_loss, "val_accuracy": epoch_accuracy} # Combine accuracies
+
+    def epoch_end(self, epoch, result):
+        print("Epoch [{}], last_lr: {:.5f}, train_loss: {:.4f}, val_loss: {:.4f}, val_acc: {:.4f}".format(
+            epoch, result['lrs'][-1], result['train_loss'], result['val_loss'], result['val_accuracy']))
+
+# Architecture for training
+# convolution block with BatchNormalization
+def ConvBlock(in_channels, out_channels, pool=False):
+    layers = [nn.Conv2d(in_channels, out_channels, kernel_size=3, padding=1),
+             nn.BatchNorm2d(out_channels),
+             nn.ReLU(inplace=True)]
+    if pool:
+        layers.append(nn.MaxPool2d(4))
+    return nn.Sequential(*layers)
+
+# resnet architecture
+# width < 1 scales every layer's channels down (see distill.py)
+class ResNet9(ImageClassificationBase):
+    def __init__(self, in_channels, num_diseases, width=1.0):
+        super().__init__()
+        c64 = max(1, int(64 * width))
+        c128, c256, c512 = 2 * c64, 4 * c64, 8 * c64
+
+        self.conv1 = ConvBlock(in_channels, c64)
+        self.conv2 = ConvBlock(c64, c128, pool=True) # out_dim : 128 x 64 x 64
+        self.res1 = nn.Sequential(ConvBlock(c128, c128), ConvBlock(c128, c128))
+
+        self.conv3 = ConvBlock(c128, c256, pool=True) # out_dim : 256 x 16 x 16
+        self.conv4 = ConvBlock(c256, c512, pool=True) # out_dim : 512 x 4 x 44
+        self.res2 = nn.Sequential(ConvBlock(c512, c512), ConvBlock(c512, c512))
+
+        self.classifier = nn.Sequential(nn.MaxPool2d(4),
+                                       nn.Flatten(),
+                                       nn.Linear(c512, num_diseases))
+
+    def features(self, xb):
+        out = self.conv1(xb)
+        out = self.conv2(out)
+        out = self.res1(out) + out
+        out = self.conv3(out)
+        out = self.conv4(out)
+        out = self.res2(out) + out
+        return out
+
+    def forward(self, xb): # xb is the loaded batch
+        return self.classifier(self.features(xb))
+
+    def embed(self, xb):
+        """Pooled features (512-d at full width), the input of the final Linear layer"""
+        return self.classifier[1](self.classifier[0](self.features(xb)))
+
+classes = ['Apple___Apple_scab',
+ 'Apple___Black_rot',
+ 'Apple___Cedar_apple_rust',
+ 'Apple___healthy',
+ 'Blueberry___healthy',
+ 'Cherry_(including_sour)___Powdery_mildew',
+ 'Cherry_(including_sour)___healthy',
+ 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
+ 'Corn_(maize)__Common_rust',
+ 'Corn_(maize)___Northern_Leaf_Blight',
+ 'Corn_(maize)___healthy',
+ 'Grape___Black_rot',
+ 'Grape__Esca(Black_Measles)',
+ 'Grape__Leaf_blight(Isariopsis_Leaf_Spot)',
+ 'Grape___healthy',
+ 'Orange__Haunglongbing(Citrus_greening)',
+ 'Peach___Bacterial_spot',
+ 'Peach___healthy',
+ 'Pepper,bell__Bacterial_spot',
+ 'Pepper,bell__healthy',
+ 'Potato___Early_blight',
+ 'Potato___Late_blight',
+ 'Potato___healthy',
+ 'Raspberry___healthy',
+ 'Soybean___healthy',
+ 'Squash___Powdery_mildew',
+ 'Strawberry___Leaf_scorch',
+ 'Strawberry___healthy',
+ 'Tomato___Bacterial_spot',
+ 'Tomato___Early_blight',
+ 'Tomato___Late_blight',
+ 'Tomato___Leaf_Mold',
+ 'Tomato___Septoria_leaf_spot',
+ 'Tomato___Spider_mites Two-spotted_spider_mite',
+ 'Tomato___Target_Spot',
+ 'Tomato___Tomato_Yellow_Leaf_Curl_Virus',
+ 'Tomato___Tomato_mosaic_virus',
+ 'Tomato___healthy']
+
+
+# Model loading
+# the app ships a state_dict checkpoint; the legacy pickled module is only
+# read once by convert_checkpoint to produce it
+MODEL_PATH = os.environ.get('PLANT_MODEL_PATH', 'plant-disease-model.pth')
+QUANTIZED = os.environ.get('PLANT_MODEL_QUANTIZED') == '1'
+# int8 checkpoint written by quantize.py, used when QUANTIZED is set
+QUANTIZED_MODEL_PATH = os.environ.get('PLANT_QUANTIZED_MODEL_PATH', 'plant-disease-model-int8.pth')
+LEGACY_MODEL_PATH = 'plant-disease-model-complete.pth'
+
+# cold/warm start timings in seconds, filled in by load_model
+load_timings = {}
+
+_models = {}
+
+def convert_checkpoint(src=LEGACY_MODEL_PATH, dst=MODEL_PATH):
+    """Rewrite a pickled ResNet9 module as a plain state_dict checkpoint"""
+    model = torch.load(src, map_location='cpu', weights_only=False)
+    torch.save(model.state_dict(), dst)
+    return dst
+
+def checkpoint_width(state_dict):
+    """Width multiplier of the ResNet9 a state_dict was saved from"""
+    return state_dict['conv1.0.weight'].shape[0] / 64
+
+def build_model(state_dict=None, num_classes=len(classes), width=None):
+    """Build ResNet9 in inference mode, optionally filling in weights
+
+    width defaults to the one the state_dict was saved with, so slim
+    students from distill.py load here too; quantize.py and the cascade
+    backend only take the full-width model.
+    """
+    if width is None:
+        width = checkpoint_width(state_dict) if state_dict is not None else 1.0
+    model = ResNet9(3, num_classes, width)
+    if state_dict is not None:
+        # assign=True keeps the memory-mapped storages instead of copying them
+        model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return model
+
+def load_state_dict(path=MODEL_PATH):
+    """Memory-map a state_dict checkpoint; pages are read on first touch"""
+    return torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+
+def default_model_path(quantized=QUANTIZED):
+    return QUANTIZED_MODEL_PATH if quantized else MODEL_PATH
+
+def load_model(path=None, quantized=QUANTIZED):
+    """Return the warm ResNet9 for this process, building it on first call
+
+    With quantized=True path is an int8 checkpoint written by quantize.py
+    (QUANTIZED_MODEL_PATH by default); the int8 model only runs on CPU.
+    """
+    start = time.perf_counter()
+    path = path or default_model_path(quantized)
+    key = (os.path.abspath(path), quantized)
+    model = _models.get(key)
+    if model is None:
+        if not os.path.exists(path):
+            # the legacy pickle can only be read from `python model.py`, where
+            # its __main__.ResNet9 reference resolves
+            hint = ' (run `python model.py` to convert {})'.format(LEGACY_MODEL_PATH) \
+                if not quantized and os.path.exists(LEGACY_MODEL_PATH) else ''
+            raise FileNotFoundError('model checkpoint {} not found{}'.format(path, hint))
+        if quantized:
+            from quantize import load_quantized
+            model = load_quantized(path)
+        else:
+            model = to_device(build_model(load_state_dict(path)), device)
+        _models[key] = model
+        load_timings['cold_start'] = time.perf_counter() - start
+        metrics.observe('plant_model_load_seconds', 'start', 'cold', load_timings['cold_start'])
+        print("Model loaded from {} in {:.3f}s (cold start)".format(path, load_timings['cold_start']))
+    else:
+        # every Streamlit rerun lands here, so this goes to /metrics rather than stdout
+        load_timings['warm_start'] = time.perf_counter() - start
+        metrics.observe('plant_model_load_seconds', 'start', 'warm', load_timings['warm_start'])
+    return model
+
+
+if __name__ == '__main__':
+    # run as a script so a checkpoint pickled from __main__ can find ResNet9
+    print('wrote', convert_checkpoint())
@@ -0,0 +1,97 @@
+import argparse
+import os
+import time
+import torch
+import torch.multiprocessing as mp
+from model import build_model, load_state_dict, MODEL_PATH
+from preprocess import preprocess, INPUT_SIZE
+
+# state of each worker process, set once by _init_worker
+_worker_model = None
+
+
+def _init_worker(model, intra_threads, inter_threads):
+    global _worker_model
+    torch.set_num_threads(intra_threads)
+    torch.set_num_interop_threads(inter_threads)
+    _worker_model = model
+
+@torch.inference_mode()
+def _run_batch(paths):
+    """Decode and classify one batch of files inside a worker"""
+    images, ok = [], []
+    for path in paths:
+        try:
+            images.append(preprocess(path))
+            ok.append(True)
+        except (OSError, ValueError):
+            images.append(torch.zeros(3, *INPUT_SIZE))
+            ok.append(False)
+    probs = torch.softmax(_worker_model(torch.stack(images)), dim=1)
+    confidence, preds = torch.max(probs, dim=1)
+    return [(path, pred if good else None, conf if good else None)
+            for path, pred, conf, good in zip(paths, preds.tolist(), confidence.tolist(), ok)]
+
+@torch.inference_mode()
+def _run_tensor(xb):
+    return _worker_model(xb).argmax(dim=1)
+
+
+class InferencePool:
+    """Process pool sharing one read-only copy of the ResNet9 weights
+
+    The parent moves the weights into shared memory before starting the
+    workers, so each worker maps the same pages instead of loading its own
+    copy. Workers pull the next batch as soon as they finish one, so a
+    slow batch never leaves other cores idle.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, processes=None, intra_threads=None, inter_threads=1):
+        cores = os.cpu_count() or 1
+        self.processes = processes or max(1, cores // 4)
+        intra_threads = intra_threads or max(1, cores // self.processes)
+        model = build_model(load_state_dict(model_path))
+        model.share_memory()
+        ctx = mp.get_context('spawn')
+        self.pool = ctx.Pool(self.processes, _init_worker, (model, intra_threads, inter_threads))
+
+    def predict_files(self, paths, batch_size=32):
+        """Yield (path, class index, confidence) in input order; index is None for unreadable files"""
+        batches = (paths[i:i + batch_size] for i in range(0, len(paths), batch_size))
+        for results in self.pool.imap(_run_batch, batches, chunksize=1):
+            yield from results
+
+    def predict_tensors(self, batches):
+        """Yield the class indices for each N x 3 x H x W batch, in order"""
+        yield from self.pool.imap(_run_tensor, batches, chunksize=1)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure process pool throughput on synthetic batches')
+    parser.add_argument('--model', default=MODEL_PATH, help='state_dict checkpoint')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--intra-threads', type=int)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--batches', type=int, default=64)
+    args = parser.parse_args()
+
+    batches = [torch.rand(args.batch_size, 3, *INPUT_SIZE) for _ in range(args.batches)]
+    for processes in args.processes:
+        with InferencePool(args.model, processes, args.intra_threads) as pool:
+            list(pool.predict_tensors(batches[:processes]))  # warm up every worker
+            start = time.perf_counter()
+            for _ in pool.predict_tensors(batches):
+                pass
+            elapsed = time.perf_counter() - start
+        print('{} processes: {:.1f} images/sec'.format(processes, args.batch_size * args.batches / elapsed))
@@ -0,0 +1,85 @@
+import functools
+import io
+import os
+import warnings
+import numpy as np
+import torch
+from PIL import Image
+from torchvision.datasets import ImageFolder
+
+# every image is fed to ResNet9 at this size
+INPUT_SIZE = (256, 256)
+
+# uploads above these limits are rejected before any pixel is decoded
+MAX_FILE_BYTES = 25 * 1024 * 1024
+MAX_PIXELS = 64 * 1000 * 1000
+
+
+class ImageRejected(ValueError):
+    """Raised for files that are too large, truncated or not an image"""
+
+
+# for finding the size of a path, bytes object or open file without reading it
+def _file_size(fp):
+    if isinstance(fp, (str, os.PathLike)):
+        return os.path.getsize(fp)
+    pos = fp.tell()
+    size = fp.seek(0, os.SEEK_END)
+    fp.seek(pos)
+    return size
+
+def load_image(fp, size=INPUT_SIZE):
+    """Decode an image straight to an RGB PIL image of the given size
+
+    JPEGs are downscaled inside the decoder (draft mode), so a phone photo
+    never exists in memory at full resolution.
+    """
+    if isinstance(fp, (bytes, bytearray, memoryview)):
+        fp = io.BytesIO(fp)
+    if _file_size(fp) > MAX_FILE_BYTES:
+        raise ImageRejected('file is larger than {} bytes'.format(MAX_FILE_BYTES))
+    try:
+        image = Image.open(fp)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageRejected(str(e))
+    # header only so far, the check is free
+    if image.width * image.height > MAX_PIXELS:
+        image.close()
+        raise ImageRejected('image has more than {} pixels'.format(MAX_PIXELS))
+    # let libjpeg decode at 1/2, 1/4 or 1/8 scale where that still covers size
+    image.draft('RGB', size)
+    try:
+        image.load()
+    except OSError as e:
+        image.close()
+        raise ImageRejected(str(e))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.size != size:
+        # reducing_gap does a cheap box reduce before the real resample
+        image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    return image
+
+def to_tensor(image, out=None):
+    """Convert an RGB PIL image to a 3 x H x W float tensor in [0, 1]
+
+    np.asarray copies the uint8 pixels once (PIL exports them through
+    tobytes()); they are then converted to float in a single pass,
+    optionally into a preallocated out tensor.
+    """
+    with warnings.catch_warnings():
+        # the array is read-only but is only ever read from here
+        warnings.simplefilter('ignore', UserWarning)
+        pixels = torch.from_numpy(np.asarray(image))  # H x W x 3 uint8
+    if out is None:
+        out = torch.empty((3, image.height, image.width), dtype=torch.float32)
+    out.copy_(pixels.permute(2, 0, 1))
+    return out.div_(255)
+
+def preprocess(fp, size=INPUT_SIZE):
+    """Decode, resize and convert an image file to a ResNet9 input tensor"""
+    return to_tensor(load_image(fp, size))
+
+def image_folder(root, size=INPUT_SIZE):
+    """Labelled dataset for a class-per-directory tree such as the Kaggle one"""
+    return ImageFolder(root, loader=functools.partial(load_image, size=size), transform=to_tensor)
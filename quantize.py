@@ -0,0 +1,131 @@
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import torch
+from torch import nn
+from torch.ao import quantization
+from torch.utils.data import DataLoader
+from model import ResNet9, classes, build_model, load_state_dict, checkpoint_width, MODEL_PATH, QUANTIZED_MODEL_PATH
+from preprocess import image_folder
+
+# names of every ConvBlock in ResNet9, each one is fused into a single op
+CONV_BLOCKS = ['conv1', 'conv2', 'res1.0', 'res1.1', 'conv3', 'conv4', 'res2.0', 'res2.1']
+
+
+# ResNet9 with quant/dequant stubs and quantizable residual adds
+class QuantizableResNet9(ResNet9):
+    def __init__(self, in_channels, num_diseases):
+        super().__init__(in_channels, num_diseases)
+        self.quant = quantization.QuantStub()
+        self.dequant = quantization.DeQuantStub()
+        self.add1 = nn.quantized.FloatFunctional()
+        self.add2 = nn.quantized.FloatFunctional()
+
+    def forward(self, xb):
+        out = self.quant(xb)
+        out = self.conv1(out)
+        out = self.conv2(out)
+        out = self.add1.add(self.res1(out), out)
+        out = self.conv3(out)
+        out = self.conv4(out)
+        out = self.add2.add(self.res2(out), out)
+        out = self.classifier(out)
+        return self.dequant(out)
+
+    def fuse_model(self):
+        """Fuse Conv2d + BatchNorm2d + ReLU inside every ConvBlock"""
+        quantization.fuse_modules(self, [[name + '.0', name + '.1', name + '.2'] for name in CONV_BLOCKS],
+                                  inplace=True)
+
+
+def prepare(state_dict=None, engine='fbgemm'):
+    """Fused, observer-instrumented model ready for calibration"""
+    torch.backends.quantized.engine = engine
+    if state_dict is not None and checkpoint_width(state_dict) != 1:
+        raise ValueError('int8 conversion only supports the full-width ResNet9, '
+                         'got a width {} student'.format(checkpoint_width(state_dict)))
+    model = QuantizableResNet9(3, len(classes))
+    if state_dict is not None:
+        model.load_state_dict(state_dict)
+    model.eval()
+    model.fuse_model()
+    model.qconfig = quantization.get_default_qconfig(engine)
+    return quantization.prepare(model)
+
+@torch.no_grad()
+def quantize(state_dict, calibration_batches, engine='fbgemm'):
+    """Calibrate activation ranges on a few batches and convert to int8"""
+    model = prepare(state_dict, engine)
+    for xb in calibration_batches:
+        model(xb)
+    return quantization.convert(model)
+
+def load_quantized(path=QUANTIZED_MODEL_PATH, engine='fbgemm'):
+    """Rebuild the int8 module structure and fill in saved int8 weights"""
+    model = quantization.convert(prepare(engine=engine))
+    # packed int8 params are not plain tensors, so weights_only can't be used
+    model.load_state_dict(torch.load(path, map_location='cpu', weights_only=False))
+    return model.eval()
+
+
+# for measuring the serialised size of a model
+def model_bytes(model):
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+@torch.inference_mode()
+def parity_report(fp32_model, int8_model, loader):
+    """Compare top-1 agreement, accuracy, latency and size of both models"""
+    seen = agree = fp32_correct = int8_correct = 0
+    fp32_time = int8_time = 0.0
+    for xb, labels in loader:
+        start = time.perf_counter()
+        fp32_preds = fp32_model(xb).argmax(dim=1)
+        fp32_time += time.perf_counter() - start
+        start = time.perf_counter()
+        int8_preds = int8_model(xb).argmax(dim=1)
+        int8_time += time.perf_counter() - start
+        seen += len(labels)
+        agree += (fp32_preds == int8_preds).sum().item()
+        fp32_correct += (fp32_preds == labels).sum().item()
+        int8_correct += (int8_preds == labels).sum().item()
+    return {'images': seen,
+            'top1_agreement': agree / seen,
+            'fp32_accuracy': fp32_correct / seen,
+            'int8_accuracy': int8_correct / seen,
+            'fp32_ms_per_image': fp32_time / seen * 1000,
+            'int8_ms_per_image': int8_time / seen * 1000,
+            'speedup': fp32_time / int8_time,
+            'fp32_bytes': model_bytes(fp32_model),
+            'int8_bytes': model_bytes(int8_model)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build an int8 ResNet9 and check it against fp32')
+    parser.add_argument('calibration_dir', help='class-per-directory images used to calibrate')
+    parser.add_argument('eval_dir', help='class-per-directory labelled images for the parity report')
+    parser.add_argument('--model', default=MODEL_PATH, help='fp32 state_dict checkpoint')
+    parser.add_argument('--output', default=QUANTIZED_MODEL_PATH)
+    parser.add_argument('--calibration-batches', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--tolerance', type=float, default=0.01, help='allowed top-1 disagreement')
+    args = parser.parse_args()
+
+    state_dict = load_state_dict(args.model)
+    calibration = DataLoader(image_folder(args.calibration_dir), batch_size=args.batch_size,
+                             shuffle=True, num_workers=args.workers)
+    int8_model = quantize(state_dict, (xb for xb, _ in itertools.islice(calibration, args.calibration_batches)))
+    torch.save(int8_model.state_dict(), args.output)
+    print('wrote', args.output)
+
+    evaluation = DataLoader(image_folder(args.eval_dir), batch_size=args.batch_size, num_workers=args.workers)
+    report = parity_report(build_model(state_dict), int8_model, evaluation)
+    print(json.dumps(report, indent=2))
+    if report['top1_agreement'] < 1 - args.tolerance:
+        sys.exit('top-1 agreement {:.4f} is outside the {} tolerance'.format(report['top1_agreement'], args.tolerance))
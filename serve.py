@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import time
+import torch
+from aiohttp import web
+from model import classes, QUANTIZED
+from backends import load_backend, backend_fingerprint, artifact_path, BACKEND, BACKENDS
+from cache import PredictionCache, CACHE_PATH
+from disease_info import disease_entry
+from embeddings import (load_matching_index, supports_embeddings, forward_with_embeddings,
+                        encode_embedding, decode_embedding, SIMILAR_K, INDEX_PATH)
+from preprocess import load_image, to_tensor, ImageRejected, MAX_FILE_BYTES
+import metrics
+
+# for decoding an upload off the event loop
+def decode(data):
+    with metrics.timed('decode'):
+        image = load_image(data)
+    with metrics.timed('transform'):
+        return to_tensor(image)
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one forward pass
+
+    A batch is sent to the model as soon as it holds max_batch_size images
+    or the oldest request has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.images = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, img):
+        """Queue one image tensor and wait for its class index and embedding (or None)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((img, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _forward(self, images):
+        with metrics.timed('forward'):
+            logits, embeddings = forward_with_embeddings(self.model, torch.stack(images))
+        preds = logits.argmax(dim=1).tolist()
+        if embeddings is None:
+            return [(pred, None) for pred in preds]
+        return list(zip(preds, embeddings))
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            images = [img for img, _ in batch]
+            self.batches += 1
+            self.images += len(batch)
+            try:
+                preds = await asyncio.to_thread(self._forward, images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), pred in zip(batch, preds):
+                if not future.done():
+                    future.set_result(pred)
+
+
+async def predict_handler(request):
+    data = await request.read()
+    if not data:
+        raise web.HTTPBadRequest(text='empty request body')
+    cache = request.app['cache']
+    # hashing up to MAX_FILE_BYTES and SQLite I/O stay off the event loop
+    cached = await asyncio.to_thread(cache.get, data) if cache is not None else None
+    if cached is None:
+        try:
+            img = await asyncio.to_thread(decode, data)
+        except ImageRejected as e:
+            raise web.HTTPBadRequest(text=str(e))
+        pred, embedding = await request.app['batcher'].submit(img)
+        cached = [pred, encode_embedding(embedding) if embedding is not None else None]
+        if cache is not None:
+            await asyncio.to_thread(cache.put, data, cached)
+    pred, embedding = cached
+    similar = []
+    index = request.app['similar_index']
+    if index is not None and embedding is not None:
+        with metrics.timed('similar'):
+            similar = (await asyncio.to_thread(index.search, decode_embedding(embedding), SIMILAR_K, 8))[0]
+    with metrics.timed('postprocess'):
+        entry = disease_entry(pred)
+    return web.json_response({'label': classes[pred],
+                              'class_index': pred,
+                              'info': entry,
+                              'similar': similar})
+
+async def stats_handler(request):
+    batcher = request.app['batcher']
+    cache = request.app['cache']
+    return web.json_response({'batches': batcher.batches,
+                              'images': batcher.images,
+                              'mean_batch_size': batcher.images / batcher.batches if batcher.batches else 0,
+                              'cache': cache.stats() if cache is not None else None})
+
+async def metrics_handler(request):
+    return web.Response(text=metrics.prometheus_text(), content_type='text/plain')
+
+def make_app(model, max_batch_size=32, max_wait_ms=5, cache=None, similar_index=None):
+    app = web.Application(client_max_size=MAX_FILE_BYTES)
+    app['batcher'] = MicroBatcher(model, max_batch_size, max_wait_ms)
+    app['cache'] = cache
+    app['similar_index'] = similar_index
+    metrics.instrument_model(model)
+
+    async def on_startup(app):
+        app['batcher'].start()
+        metrics.start_snapshot_logger()
+
+    async def on_cleanup(app):
+        await app['batcher'].stop()
+        if metrics.ENABLED:
+            metrics.log_snapshot()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post('/predict', predict_handler)
+    app.router.add_get('/stats', stats_handler)
+    app.router.add_get('/metrics', metrics_handler)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-batching inference server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND)
+    parser.add_argument('--model', help="checkpoint or exported model, defaults to the backend's standard path")
+    parser.add_argument('--quantized', action='store_true', default=QUANTIZED,
+                        help='eager backend only: load the int8 checkpoint from quantize.py (--model or PLANT_QUANTIZED_MODEL_PATH)')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--cache-entries', type=int, default=10000, help='0 disables the prediction cache')
+    parser.add_argument('--cache-path', default=CACHE_PATH, help='SQLite file for the on-disk cache tier')
+    parser.add_argument('--similar-index', default=INDEX_PATH, help='embeddings.py index of confirmed cases')
+    args = parser.parse_args()
+    cache = None
+    if args.cache_entries:
+        cache = PredictionCache(backend_fingerprint(args.backend, args.model, args.quantized),
+                                args.cache_entries, args.cache_path)
+    model = load_backend(args.backend, args.model, args.quantized)
+    similar_index = None
+    if supports_embeddings(model):
+        similar_index = load_matching_index(artifact_path(args.backend, args.model, args.quantized),
+                                            args.similar_index)
+    web.run_app(make_app(model, args.max_batch_size, args.max_wait_ms, cache, similar_index),
+                host=args.host, port=args.port)
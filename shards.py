@@ -0,0 +1,150 @@
+import argparse
+import bisect
+import functools
+import json
+import os
+import warnings
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader, Sampler
+from torchvision.datasets import ImageFolder
+from preprocess import load_image, INPUT_SIZE
+
+INDEX_NAME = 'index.json'
+
+
+# for writing a class-per-directory image tree into uint8 shard files
+def ingest(root, out_dir, shard_size=4096, size=INPUT_SIZE, workers=os.cpu_count()):
+    """Decode and resize every image once and write fixed-layout shards
+
+    Each shard is a pair of .npy files: N x H x W x 3 uint8 pixels and N
+    int16 labels. index.json lists the shards, their counts, the class
+    names and the image size.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    source = ImageFolder(root, loader=functools.partial(load_image, size=size), transform=np.asarray)
+    loader = DataLoader(source, batch_size=256, num_workers=workers)
+    height, width = size[1], size[0]
+    shards = []
+    images = labels = None
+    filled = 0
+
+    def finish():
+        images.flush()
+        labels.flush()
+        shards[-1]['count'] = filled
+
+    for batch, batch_labels in loader:
+        pos = 0
+        while pos < len(batch):
+            if images is None or filled == shard_size:
+                if images is not None:
+                    finish()
+                name = 'shard-{:05d}'.format(len(shards))
+                count = min(shard_size, len(source) - sum(s['count'] for s in shards))
+                images = np.lib.format.open_memmap(os.path.join(out_dir, name + '-images.npy'), mode='w+',
+                                                   dtype=np.uint8, shape=(count, height, width, 3))
+                labels = np.lib.format.open_memmap(os.path.join(out_dir, name + '-labels.npy'), mode='w+',
+                                                   dtype=np.int16, shape=(count,))
+                shards.append({'images': name + '-images.npy', 'labels': name + '-labels.npy', 'count': count})
+                filled = 0
+            take = min(len(batch) - pos, shard_size - filled)
+            images[filled:filled + take] = batch[pos:pos + take].numpy()
+            labels[filled:filled + take] = batch_labels[pos:pos + take].numpy()
+            filled += take
+            pos += take
+    if images is not None:
+        finish()
+
+    with open(os.path.join(out_dir, INDEX_NAME), 'w') as f:
+        json.dump({'classes': source.classes, 'size': list(size), 'shards': shards}, f, indent=2)
+    return shards
+
+
+class ShardDataset(Dataset):
+    """Random access over ingested shards
+
+    Shards are memory-mapped on first use in each worker, so every worker
+    process shares the same page cache instead of holding its own copy.
+    Items are uint8 3 x H x W views into the mapping unless as_float is
+    set, in which case they are converted to floats in [0, 1].
+    """
+
+    def __init__(self, shard_dir, as_float=True):
+        self.shard_dir = shard_dir
+        self.as_float = as_float
+        with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+            index = json.load(f)
+        self.classes = index['classes']
+        self.shards = index['shards']
+        self.offsets = np.cumsum([0] + [s['count'] for s in self.shards]).tolist()
+        self._maps = None
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def _open(self):
+        self._maps = [(np.load(os.path.join(self.shard_dir, s['images']), mmap_mode='r'),
+                       np.load(os.path.join(self.shard_dir, s['labels']), mmap_mode='r'))
+                      for s in self.shards]
+
+    def locate(self, idx):
+        """(shard number, row within the shard) of a dataset index"""
+        shard = bisect.bisect_right(self.offsets, idx) - 1
+        return shard, idx - self.offsets[shard]
+
+    def __getitem__(self, idx):
+        if self._maps is None:
+            self._open()
+        shard, row = self.locate(idx)
+        images, labels = self._maps[shard]
+        with warnings.catch_warnings():
+            # the mapping is read-only and never written through
+            warnings.simplefilter('ignore', UserWarning)
+            img = torch.from_numpy(images[row]).permute(2, 0, 1)
+        if self.as_float:
+            img = img.float().div_(255)
+        return img, int(labels[row])
+
+    def __getstate__(self):
+        # workers open their own mappings
+        state = self.__dict__.copy()
+        state['_maps'] = None
+        return state
+
+
+class ShardShuffleSampler(Sampler):
+    """Shuffles shard order and rows within each shard, reading one shard at a time
+
+    Keeps reads local to one mapped file, which matters once the shards
+    do not all fit in the page cache.
+    """
+
+    def __init__(self, dataset, seed=0):
+        self.dataset = dataset
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __iter__(self):
+        generator = torch.Generator().manual_seed(self.seed + self.epoch)
+        offsets = self.dataset.offsets
+        for shard in torch.randperm(len(offsets) - 1, generator=generator).tolist():
+            start, end = offsets[shard], offsets[shard + 1]
+            yield from (start + torch.randperm(end - start, generator=generator)).tolist()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a class-per-directory image tree into uint8 shards')
+    parser.add_argument('root', help='e.g. the Kaggle train/ or valid/ directory')
+    parser.add_argument('out_dir')
+    parser.add_argument('--shard-size', type=int, default=4096, help='images per shard')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    shards = ingest(args.root, args.out_dir, args.shard_size, workers=args.workers)
+    print('wrote {} images in {} shards to {}'.format(sum(s['count'] for s in shards), len(shards), args.out_dir))
@@ -0,0 +1,198 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import torch
+from model import classes, device, to_device
+from backends import load_backend, BACKEND, BACKENDS
+from preprocess import INPUT_SIZE
+
+_END = object()
+
+
+# for reading frames on their own thread so decoding overlaps inference
+def start_reader(source, frames, stop):
+    """Push (frame number, timestamp in s, BGR frame) onto frames until the source ends"""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise OSError('could not open video source {!r}'.format(source))
+    live = str(source).isdigit()
+    started = time.monotonic()
+
+    def put(item):
+        # give up once the consumer has stopped, instead of blocking forever
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read():
+        number = 0
+        try:
+            while not stop.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                timestamp = time.monotonic() - started if live else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                item = (number, timestamp, frame)
+                if live and frames.full():
+                    # a camera can't wait for us: drop the oldest frame instead
+                    try:
+                        frames.get_nowait()
+                    except queue.Empty:
+                        pass
+                put(item)
+                number += 1
+        finally:
+            capture.release()
+            put(_END)
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    return thread
+
+class ChangeDetector:
+    """Flags frames that differ from the last classified frame
+
+    Frames are compared as 32 x 32 grayscale thumbnails; the mean absolute
+    difference in [0, 255] has to exceed threshold.
+    """
+
+    def __init__(self, threshold=8.0, size=32):
+        self.threshold = threshold
+        self.size = size
+        self.reference = None
+
+    def signature(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def changed(self, frame):
+        signature = self.signature(frame)
+        if self.reference is not None and np.abs(signature - self.reference).mean() < self.threshold:
+            return False
+        self.reference = signature
+        return True
+
+def frame_to_tensor(frame, out):
+    rgb = cv2.cvtColor(cv2.resize(frame, INPUT_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+    return out.copy_(torch.from_numpy(rgb).permute(2, 0, 1)).div_(255)
+
+class SegmentTracker:
+    """Smooths per-frame probabilities and groups frames into labelled segments"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.smoothed = None
+        self.current = None
+
+    def update(self, number, timestamp, probs=None):
+        """Feed one frame (probs None for a skipped frame); return a finished segment or None"""
+        if probs is not None:
+            self.smoothed = probs if self.smoothed is None else self.alpha * probs + (1 - self.alpha) * self.smoothed
+        if self.smoothed is None:
+            return None
+        label = int(self.smoothed.argmax())
+        confidence = float(self.smoothed[label])
+        finished = None
+        if self.current is not None and self.current['class_index'] != label:
+            finished = self.close()
+        if self.current is None:
+            self.current = {'class_index': label, 'label': classes[label], 'start_frame': number,
+                            'start_time': timestamp, 'confidence_sum': 0.0, 'frames': 0}
+        self.current['end_frame'] = number
+        self.current['end_time'] = timestamp
+        self.current['confidence_sum'] += confidence
+        self.current['frames'] += 1
+        return finished
+
+    def close(self):
+        segment, self.current = self.current, None
+        if segment is not None:
+            segment['confidence'] = segment.pop('confidence_sum') / segment['frames']
+        return segment
+
+@torch.inference_mode()
+def run(source, model, batch_size=8, change_threshold=8.0, alpha=0.3, queue_size=64, stats=None):
+    """Yield labelled segments while classifying only the frames that changed
+
+    A stats dict, if given, is filled with the frames read and classified
+    and the seconds taken, also when the caller stops early.
+    """
+    frames = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    start_reader(source, frames, stop)
+    detector = ChangeDetector(change_threshold)
+    tracker = SegmentTracker(alpha)
+    buffer = torch.empty(batch_size, 3, *INPUT_SIZE)
+    stats = {} if stats is None else stats
+    stats.update(frames=0, classified=0, seconds=0.0)
+    started = time.perf_counter()
+    # (frame number, timestamp, classified?) for every frame since the last micro-batch
+    pending, batched = [], 0
+    done = False
+    try:
+        while not done:
+            item = frames.get()
+            while True:
+                if item is _END:
+                    done = True
+                    break
+                number, timestamp, frame = item
+                stats['frames'] += 1
+                if detector.changed(frame):
+                    frame_to_tensor(frame, buffer[batched])
+                    batched += 1
+                    pending.append((number, timestamp, True))
+                else:
+                    pending.append((number, timestamp, False))
+                if batched == batch_size:
+                    break
+                try:
+                    # keep filling the batch only with frames that are already decoded
+                    item = frames.get_nowait()
+                except queue.Empty:
+                    break
+            probs = iter(())
+            if batched:
+                probs = iter(torch.softmax(model(to_device(buffer[:batched], device)), dim=1).cpu())
+                stats['classified'] += batched
+            for number, timestamp, classified in pending:
+                segment = tracker.update(number, timestamp, next(probs) if classified else None)
+                if segment:
+                    yield segment
+            pending, batched = [], 0
+        segment = tracker.close()
+        if segment:
+            yield segment
+    finally:
+        stop.set()
+        stats['seconds'] = time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Classify a video file or camera stream by segment')
+    parser.add_argument('source', help='video file, stream URL or camera index (e.g. 0)')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--change-threshold', type=float, default=8.0,
+                        help='mean 32x32 grayscale difference needed to classify a frame again')
+    parser.add_argument('--alpha', type=float, default=0.3, help='weight of the newest frame in the smoothing')
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND)
+    parser.add_argument('--model', help="checkpoint or exported model, defaults to the backend's standard path")
+    args = parser.parse_args()
+
+    model = load_backend(args.backend, args.model)
+    stats = {}
+    try:
+        for segment in run(args.source, model, args.batch_size, args.change_threshold, args.alpha, stats=stats):
+            print(json.dumps(segment))
+    finally:
+        # empty if the source could not be opened
+        if stats:
+            print('{frames} frames, {classified} classified, {fps:.1f} frames/sec'.format(
+                fps=stats['frames'] / stats['seconds'] if stats['seconds'] else 0, **stats))
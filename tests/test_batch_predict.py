@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip('torch')
+from batch_predict import ResultWriter, completed_paths, truncate_partial_line
+
+
+def write(output, paths):
+    writer = ResultWriter(output)
+    for path in paths:
+        writer.write({'path': path, 'label': 'Apple___healthy', 'confidence': 0.9})
+    writer.flush()
+    writer.close()
+
+@pytest.mark.parametrize('name', ['out.jsonl', 'out.csv'])
+def test_resume_after_cut_off_record(tmp_path, name):
+    output = str(tmp_path / name)
+    write(output, ['a.jpg', 'b.jpg'])
+    with open(output, 'a') as f:
+        f.write('{"path": "c.j' if name.endswith('.jsonl') else 'c.jpg,Apple')  # killed mid-write
+    truncate_partial_line(output)
+    assert completed_paths(output) == {'a.jpg', 'b.jpg'}
+    write(output, ['c.jpg', 'd.jpg'])
+    assert completed_paths(output) == {'a.jpg', 'b.jpg', 'c.jpg', 'd.jpg'}
+    with open(output) as f:
+        assert sum('c.jpg' in line for line in f) == 1
+
+def test_damaged_line_does_not_hide_later_records(tmp_path):
+    output = str(tmp_path / 'out.jsonl')
+    with open(output, 'w') as f:
+        f.write('{"path": "a.jpg"}\nnot json\n{"path": "b.jpg"}\n')
+    assert completed_paths(output) == {'a.jpg', 'b.jpg'}
@@ -0,0 +1,44 @@
+from cache import PredictionCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache('model', max_entries=2)
+    cache.put(b'a', [1, None])
+    cache.put(b'b', [2, None])
+    assert cache.get(b'a') == [1, None]  # a is now the most recent
+    cache.put(b'c', [3, None])
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == [1, None]
+    assert cache.get(b'c') == [3, None]
+    assert cache.stats()['evictions'] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    PredictionCache('model', disk_path=path).put(b'leaf', [7, None])
+    cache = PredictionCache('model', disk_path=path)
+    assert cache.get(b'leaf') == [7, None]
+    assert cache.stats()['disk_hits'] == 1
+
+def test_other_fingerprint_misses_without_wiping(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    PredictionCache('model-a', disk_path=path).put(b'leaf', [1, None])
+    other = PredictionCache('model-b', disk_path=path)
+    assert other.get(b'leaf') is None
+    other.put(b'leaf', [2, None])
+    assert PredictionCache('model-a', disk_path=path).get(b'leaf') == [1, None]
+    assert PredictionCache('model-b', disk_path=path).get(b'leaf') == [2, None]
+
+def test_disk_tier_keeps_newest_rows(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = PredictionCache('model', max_entries=1, disk_path=path, max_disk_entries=2)
+    for i in range(3):
+        cache.put(str(i).encode(), [i, None])
+    cache = PredictionCache('model', disk_path=path, max_disk_entries=2)
+    assert cache.get(b'0') is None
+    assert cache.get(b'2') == [2, None]
+
+def test_stale_fingerprints_are_dropped(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    PredictionCache('old-model', disk_path=path).put(b'leaf', [1, None])
+    PredictionCache('new-model', disk_path=path, stale_after=-1)
+    assert PredictionCache('old-model', disk_path=path).get(b'leaf') is None
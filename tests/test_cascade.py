@@ -0,0 +1,24 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+from model import build_model
+from cascade import CascadeResNet9
+
+
+def models():
+    torch.manual_seed(0)
+    return build_model(), build_model(width=0.25)
+
+def test_confident_head_answers_alone():
+    full, head = models()
+    cascade = CascadeResNet9(full, head, threshold=0.0).eval()
+    xb = torch.rand(3, 3, 256, 256)
+    with torch.no_grad():
+        assert torch.allclose(cascade(xb), head(xb))
+
+def test_unconfident_images_fall_back_to_full_model():
+    full, head = models()
+    cascade = CascadeResNet9(full, head, threshold=1.1).eval()
+    xb = torch.rand(3, 3, 256, 256)
+    with torch.no_grad():
+        assert torch.allclose(cascade(xb), full(xb), atol=1e-5)
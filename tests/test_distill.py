@@ -0,0 +1,33 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+from model import build_model
+from distill import prune
+
+
+def teacher():
+    torch.manual_seed(0)
+    model = build_model()
+    # non-trivial BatchNorm statistics, so a wrong channel slice shows up
+    for module in model.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+    return model
+
+@pytest.mark.parametrize('width', [0.5, 0.25])
+def test_pruned_shapes(width):
+    student = prune(teacher(), width)
+    c64 = int(64 * width)
+    assert student.conv1[0].weight.shape == (c64, 3, 3, 3)
+    assert student.res1[1][0].weight.shape == (2 * c64, 2 * c64, 3, 3)
+    assert student.res2[1][0].weight.shape == (8 * c64, 8 * c64, 3, 3)
+    assert student.classifier[2].weight.shape == (38, 8 * c64)
+    assert student.eval()(torch.rand(2, 3, 256, 256)).shape == (2, 38)
+
+def test_full_width_prune_matches_teacher():
+    model = teacher()
+    student = prune(model, 1.0).eval()
+    xb = torch.rand(2, 3, 256, 256)
+    with torch.no_grad():
+        assert torch.allclose(student(xb), model(xb), atol=1e-5)
@@ -0,0 +1,31 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('numpy')
+import metrics
+from model import build_model
+from embeddings import forward_with_embeddings, embed_images
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return build_model().eval()
+
+def test_matches_separate_passes(model):
+    xb = torch.rand(2, 3, 256, 256)
+    logits, embeddings = forward_with_embeddings(model, xb)
+    with torch.inference_mode():
+        assert torch.allclose(logits, model(xb), atol=1e-5)
+    assert embeddings == pytest.approx(embed_images(model, xb), abs=1e-5)
+
+def test_layer_timings_recorded(model, monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    handles = metrics.instrument_model(model)
+    try:
+        forward_with_embeddings(model, torch.rand(1, 3, 256, 256))
+    finally:
+        for handle in handles:
+            handle.remove()
+    assert 'layer:classifier' in metrics.snapshot()
+    assert 'layer:conv1' in metrics.snapshot()
@@ -0,0 +1,28 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+from evaluate import StreamingEvaluator
+
+
+def test_merged_shards_match_single_pass():
+    generator = torch.Generator().manual_seed(0)
+    logits = torch.randn(257, 38, generator=generator)
+    labels = torch.randint(0, 38, (257,), generator=generator)
+
+    whole = StreamingEvaluator()
+    whole.update(logits, labels)
+
+    shards = [StreamingEvaluator() for _ in range(3)]
+    for i, shard in enumerate(shards):
+        # uneven batches inside every shard
+        index = torch.arange(i, 257, 3)
+        for chunk in index.split(17):
+            shard.update(logits[chunk], labels[chunk])
+    merged = StreamingEvaluator.from_state(shards[0].state())
+    for shard in shards[1:]:
+        merged.merge(shard)
+
+    assert torch.equal(merged.confusion, whole.confusion)
+    assert torch.equal(merged.topk_hits, whole.topk_hits)
+    assert torch.allclose(merged.loss_sum, whole.loss_sum)
+    assert merged.report()['accuracy'] == whole.report()['accuracy']
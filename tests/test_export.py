@@ -0,0 +1,16 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+from model import build_model
+from backends import load_torchscript
+from export import export_torchscript
+
+
+def test_torchscript_round_trip_with_new_batch_size(tmp_path):
+    torch.manual_seed(0)
+    model = build_model()
+    path = export_torchscript(model, str(tmp_path / 'model.torchscript.pt'), batch_size=2)
+    loaded = load_torchscript(path)
+    xb = torch.rand(3, 3, 256, 256)
+    with torch.no_grad():
+        assert torch.allclose(loaded(xb), model(xb), atol=1e-3)
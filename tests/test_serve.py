@@ -0,0 +1,59 @@
+import asyncio
+import time
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('aiohttp')
+from serve import MicroBatcher
+
+
+class RecordingModel:
+    """Predicts the class stored in each image's first pixel"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, xb):
+        self.batch_sizes.append(len(xb))
+        return torch.nn.functional.one_hot(xb[:, 0, 0, 0].long(), 38).float()
+
+def image(label):
+    img = torch.zeros(3, 4, 4)
+    img[0, 0, 0] = label
+    return img
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_concurrent_requests_share_a_batch():
+    model = RecordingModel()
+
+    async def main():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=200)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(image(i)) for i in range(6)))
+        finally:
+            await batcher.stop()
+
+    results = run(main())
+    assert [pred for pred, _ in results] == list(range(6))
+    assert model.batch_sizes == [4, 2]
+
+def test_lone_request_waits_at_most_max_wait():
+    model = RecordingModel()
+
+    async def main():
+        batcher = MicroBatcher(model, max_batch_size=32, max_wait_ms=20)
+        batcher.start()
+        try:
+            start = time.monotonic()
+            pred, _ = await batcher.submit(image(5))
+            return pred, time.monotonic() - start
+        finally:
+            await batcher.stop()
+
+    pred, elapsed = run(main())
+    assert pred == 5
+    assert model.batch_sizes == [1]
+    assert elapsed < 1.0
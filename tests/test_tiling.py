@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip('torch')
+from tiling import tile_origins, TILE
+
+
+@pytest.mark.parametrize('length', [1, TILE - 1, TILE, TILE + 1, 2 * TILE, 1000, 4097])
+@pytest.mark.parametrize('stride', [TILE // 2, TILE, TILE // 3])
+def test_tiles_cover_every_pixel(length, stride):
+    origins = tile_origins(length, stride=stride)
+    assert origins[0] == 0
+    assert origins == sorted(set(origins))
+    if length <= TILE:
+        assert origins == [0]
+        return
+    assert origins[-1] == length - TILE
+    assert all(0 <= y <= length - TILE for y in origins)
+    # consecutive tiles leave no gap
+    assert all(b - a <= TILE for a, b in zip(origins, origins[1:]))
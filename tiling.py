@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import warnings
+import numpy as np
+import torch
+from PIL import Image
+from model import classes, device, to_device
+from backends import load_backend, BACKEND, BACKENDS
+from preprocess import INPUT_SIZE
+
+TILE = INPUT_SIZE[0]
+
+
+# for getting an H x W x 3 uint8 raster without holding it all in memory
+def open_raster(path):
+    """Open a raster that supports numpy slicing on (rows, cols, bands)
+
+    .npy and uncompressed TIFFs are memory-mapped. Compressed or tiled
+    TIFFs (the usual GeoTIFF orthomosaic) are opened through tifffile's
+    zarr store, which decodes only the strips or tiles a slice touches.
+    JPEG and PNG have no random access and are decoded whole, costing
+    about twice the raster size at peak; convert large mosaics to a tiled
+    TIFF first. Pillow's decompression-bomb limit still applies to them.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    if path.lower().endswith(('.tif', '.tiff')):
+        try:
+            import tifffile
+        except ImportError:
+            tifffile = None
+        if tifffile is not None:
+            try:
+                return tifffile.memmap(path, mode='r')
+            except ValueError:
+                # compressed or tiled, so the pixels can't be mapped as they are
+                pass
+            import zarr
+            raster = zarr.open(tifffile.imread(path, aszarr=True), mode='r')
+            # pyramidal TIFFs open as a group of levels, full resolution first
+            return raster['0'] if isinstance(raster, zarr.Group) else raster
+    with Image.open(path) as image:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+
+def tile_origins(length, tile=TILE, stride=TILE // 2):
+    """Start offsets covering [0, length), the last tile flush with the edge"""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile + 1, stride))
+    if origins[-1] != length - tile:
+        origins.append(length - tile)
+    return origins
+
+def iter_tile_batches(raster, batch_size=64, stride=TILE // 2):
+    """Yield (row/col grid positions, float batch) for overlapping tiles
+
+    The raster is read one band of TILE rows at a time (a view for mapped
+    rasters, one decode per band for zarr-backed TIFFs) and tiles are
+    slices of that band, copied only by the uint8 -> float conversion into
+    one reused batch buffer. Memory stays bounded by one band plus
+    batch_size tiles whatever the raster height.
+    """
+    height, width = raster.shape[:2]
+    ys, xs = tile_origins(height, stride=stride), tile_origins(width, stride=stride)
+    buffer = torch.empty(batch_size, 3, TILE, TILE)
+    positions = []
+    for row, y in enumerate(ys):
+        band = np.asarray(raster[y:y + TILE])
+        for col, x in enumerate(xs):
+            tile = band[:, x:x + TILE, :3]
+            out = buffer[len(positions)]
+            if tile.shape[0] != TILE or tile.shape[1] != TILE:
+                # raster smaller than one tile: pad with black
+                out.zero_()
+                out = out[:, :tile.shape[0], :tile.shape[1]]
+            with warnings.catch_warnings():
+                # read-only mapping, only ever read through this view
+                warnings.simplefilter('ignore', UserWarning)
+                pixels = torch.from_numpy(tile)
+            out.copy_(pixels.permute(2, 0, 1)).div_(255)
+            positions.append((row, col))
+            if len(positions) == batch_size:
+                yield positions, buffer
+                positions = []
+    if positions:
+        yield positions, buffer[:len(positions)]
+
+@torch.inference_mode()
+def classify_tiles(raster, model, batch_size=64, stride=TILE // 2):
+    """Per-tile class probabilities as a rows x cols x classes heatmap"""
+    height, width = raster.shape[:2]
+    heatmap = np.zeros((len(tile_origins(height, stride=stride)), len(tile_origins(width, stride=stride)),
+                        len(classes)), dtype=np.float32)
+    for positions, xb in iter_tile_batches(raster, batch_size, stride):
+        probs = torch.softmax(model(to_device(xb, device)), dim=1).cpu().numpy()
+        rows, cols = zip(*positions)
+        heatmap[list(rows), list(cols)] = probs
+    return heatmap
+
+def summarize(heatmap, min_confidence=0.5):
+    """Share of tiles per predicted class and the diseased fraction of the image"""
+    confidence = heatmap.max(axis=2)
+    preds = heatmap.argmax(axis=2)
+    confident = confidence >= min_confidence
+    total = preds.size
+    per_class = {}
+    for index in np.unique(preds[confident]):
+        per_class[classes[index]] = float((preds[confident] == index).sum() / total)
+    healthy = np.array(['healthy' in name for name in classes])
+    diseased = confident & ~healthy[preds]
+    return {'tiles': int(total),
+            'uncertain_fraction': float((~confident).sum() / total),
+            'affected_fraction': float(diseased.sum() / total),
+            'class_fractions': dict(sorted(per_class.items(), key=lambda item: -item[1]))}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sliding-window disease map for large field or drone images')
+    parser.add_argument('image', help='JPEG/PNG/TIFF, or an H x W x 3 uint8 .npy raster')
+    parser.add_argument('--output', help='prefix for <prefix>-heatmap.npy and <prefix>-summary.json')
+    parser.add_argument('--stride', type=int, default=TILE // 2, help='pixels between tiles, < 256 overlaps')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND)
+    parser.add_argument('--model', help="checkpoint or exported model, defaults to the backend's standard path")
+    args = parser.parse_args()
+
+    Image.MAX_IMAGE_PIXELS = None  # field mosaics are large on purpose
+    raster = open_raster(args.image)
+    heatmap = classify_tiles(raster, load_backend(args.backend, args.model), args.batch_size, args.stride)
+    summary = summarize(heatmap, args.min_confidence)
+    print(json.dumps(summary, indent=2))
+    prefix = args.output or os.path.splitext(args.image)[0]
+    np.save(prefix + '-heatmap.npy', heatmap)
+    with open(prefix + '-summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    print('wrote', prefix + '-heatmap.npy', prefix + '-summary.json')
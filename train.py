@@ -0,0 +1,143 @@
+import argparse
+import os
+import time
+import torch
+from torch import nn
+from torch.utils.data import DataLoader
+from model import ResNet9, classes, MODEL_PATH
+from preprocess import image_folder
+from shards import ShardDataset, ShardShuffleSampler, INDEX_NAME
+
+# for reading a split from shards.py output if present, else from images
+def load_split(path):
+    if os.path.exists(os.path.join(path, INDEX_NAME)):
+        return ShardDataset(path)
+    return image_folder(path)
+
+# for evaluating the model on the validation set
+@torch.no_grad()
+def evaluate(model, val_loader, bf16=False):
+    model.eval()
+    outputs = []
+    for images, labels in val_loader:
+        images = images.contiguous(memory_format=torch.channels_last)
+        with torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+            outputs.append(model.validation_step((images, labels)))
+    return model.validation_epoch_end(outputs)
+
+# for getting the current learning rate
+def get_lr(optimizer):
+    for param_group in optimizer.param_groups:
+        return param_group['lr']
+
+def save_checkpoint(model, path):
+    """Write the weights as a plain state_dict that load_model can mmap"""
+    tmp = path + '.tmp'
+    torch.save(model.state_dict(), tmp)
+    os.replace(tmp, path)
+
+def fit_OneCycle(epochs, max_lr, model, train_loader, val_loader, weight_decay=0,
+                 grad_clip=None, opt_func=torch.optim.SGD, bf16=False,
+                 checkpoint_dir=None, checkpoint_every=1, step=None):
+    """Train with a one-cycle learning rate schedule
+
+    bf16 runs forward/backward under bfloat16 autocast on CPU, which uses
+    the AMX/AVX512-BF16 units where the CPU has them; weights stay fp32.
+    step(batch) returns the training loss, model.training_step by default.
+    """
+    step = step or model.training_step
+    history = []
+    model.to(memory_format=torch.channels_last)
+    optimizer = opt_func(model.parameters(), max_lr, weight_decay=weight_decay)
+    # scheduler for one cycle learning rate
+    sched = torch.optim.lr_scheduler.OneCycleLR(optimizer, max_lr, epochs=epochs,
+                                                steps_per_epoch=len(train_loader))
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    for epoch in range(epochs):
+        # Training
+        model.train()
+        if hasattr(train_loader.sampler, 'set_epoch'):
+            train_loader.sampler.set_epoch(epoch)
+        train_losses = []
+        lrs = []
+        samples = 0
+        start = time.perf_counter()
+        for images, labels in train_loader:
+            images = images.contiguous(memory_format=torch.channels_last)
+            with torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+                loss = step((images, labels))
+            train_losses.append(loss.detach())
+            loss.backward()
+
+            # gradient clipping
+            if grad_clip:
+                nn.utils.clip_grad_value_(model.parameters(), grad_clip)
+
+            optimizer.step()
+            optimizer.zero_grad(set_to_none=True)
+
+            # recording and updating learning rates
+            lrs.append(get_lr(optimizer))
+            sched.step()
+            samples += len(labels)
+        train_time = time.perf_counter() - start
+
+        # validation
+        result = evaluate(model, val_loader, bf16)
+        result['train_loss'] = torch.stack(train_losses).float().mean().item()
+        result['lrs'] = lrs
+        result['samples_per_sec'] = samples / train_time
+        model.epoch_end(epoch, result)
+        print("Epoch [{}], {:.1f} samples/sec, {:.1f}s".format(epoch, result['samples_per_sec'], train_time))
+        history.append(result)
+
+        if checkpoint_dir and (epoch + 1) % checkpoint_every == 0:
+            save_checkpoint(model, os.path.join(checkpoint_dir, 'epoch-{}.pth'.format(epoch)))
+
+    return history
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train ResNet9 on the plant disease dataset')
+    parser.add_argument('data_dir', help='dataset root containing train/ and valid/ (images or shards)')
+    parser.add_argument('--output', default=MODEL_PATH, help='final state_dict checkpoint')
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--max-lr', type=float, default=0.01)
+    parser.add_argument('--grad-clip', type=float, default=0.1)
+    parser.add_argument('--weight-decay', type=float, default=1e-4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--prefetch-factor', type=int, default=4)
+    parser.add_argument('--threads', type=int, help='intra-op threads for the training process')
+    parser.add_argument('--bf16', action='store_true', help='bfloat16 autocast on CPU')
+    parser.add_argument('--checkpoint-dir', default='checkpoints')
+    parser.add_argument('--checkpoint-every', type=int, default=1, help='epochs between checkpoints')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    train_ds = load_split(os.path.join(args.data_dir, 'train'))
+    valid_ds = load_split(os.path.join(args.data_dir, 'valid'))
+    if len(train_ds.classes) != len(classes):
+        parser.error('expected {} class directories, found {}'.format(len(classes), len(train_ds.classes)))
+    loader_args = dict(batch_size=args.batch_size, num_workers=args.workers)
+    if args.workers:
+        loader_args.update(persistent_workers=True, prefetch_factor=args.prefetch_factor)
+    if isinstance(train_ds, ShardDataset):
+        train_dl = DataLoader(train_ds, sampler=ShardShuffleSampler(train_ds, args.seed), drop_last=True, **loader_args)
+    else:
+        train_dl = DataLoader(train_ds, shuffle=True, drop_last=True, **loader_args)
+    valid_dl = DataLoader(valid_ds, **loader_args)
+
+    model = ResNet9(3, len(classes))
+    fit_OneCycle(args.epochs, args.max_lr, model, train_dl, valid_dl,
+                 weight_decay=args.weight_decay, grad_clip=args.grad_clip,
+                 opt_func=torch.optim.Adam, bf16=args.bf16,
+                 checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every)
+    save_checkpoint(model, args.output)
+    print('wrote', args.output)